@@ -3,6 +3,7 @@ Element classification utilities for PDF processing.
 Handles classification of elements as figures, tables, or other types.
 """
 
+import re
 from typing import List, Optional
 from unstructured.documents.elements import (
     Element,
@@ -12,39 +13,80 @@ from unstructured.documents.elements import (
 from core.pdf_extraction_config import PDFConstants, CaptionKeywords, ElementType
 from core.pdf_extraction_models import BoundingBox, BoundingBoxLegacy
 from utils.bbox_operations import BoundingBoxOperations, BoundingBoxCalculator
-from utils.caption_detector import CaptionDetector, CaptionExtractor
+from utils.caption_detector import CaptionDetector, CaptionExtractor, CaptionIndex
+
+
+# Patterns used to detect labeled diagrams misdetected as tables
+_DIAGRAM_QUAD_RE = re.compile(r'\b\d+\s+\d+\s+\d+\s+\d+\b')
+_SINGLE_DIGIT_RE = re.compile(r'\b\d\b')
+
+_IMAGE_CATEGORIES = frozenset(('Image', 'Figure'))
 
 
 class ElementClassifier:
     """Classifies elements as figures or tables based on context and characteristics."""
     
+    # Element kinds produced by precompute_kinds
+    KIND_IMAGE = 0
+    KIND_TABLE = 1
+    KIND_OTHER = 2
+    
     @classmethod
     def classify(cls, element: Element, elements: List[Element], 
-                element_index: int, page: int) -> str:
-        """Classify an element as figure or table (returns string for legacy compatibility)."""
-        if cls._is_image_element(element):
+                element_index: int, page: int,
+                kinds: Optional[List[int]] = None,
+                captions: Optional[CaptionIndex] = None) -> str:
+        """Classify an element as figure or table (returns string for legacy compatibility).
+        
+        `kinds` is an optional list from precompute_kinds(elements); it is only
+        consulted when `element` is the element at `element_index`.
+        `captions` is an optional CaptionIndex built over the same `elements`.
+        """
+        if kinds is not None and elements[element_index] is element:
+            kind = kinds[element_index]
+        else:
+            kind = cls._element_kind(element)
+        
+        if kind == cls.KIND_IMAGE:
             return 'figure'
         
-        if isinstance(element, Table):
-            return cls._classify_table(element, elements, element_index, page)
+        if kind == cls.KIND_TABLE:
+            return cls._classify_table(element, elements, element_index, page, captions)
         
         return 'unknown'
     
+    @classmethod
+    def precompute_kinds(cls, elements: List[Element]) -> List[int]:
+        """Determine the kind of every element once, for reuse across classify calls."""
+        return [cls._element_kind(element) for element in elements]
+    
+    @classmethod
+    def _element_kind(cls, element: Element) -> int:
+        """Return the KIND_* value for an element."""
+        if cls._is_image_element(element):
+            return cls.KIND_IMAGE
+        if isinstance(element, Table):
+            return cls.KIND_TABLE
+        return cls.KIND_OTHER
+    
     @classmethod
     def _is_image_element(cls, element: Element) -> bool:
         """Check if element is an image/figure."""
-        return (isinstance(element, UnstructuredImage) or 
-                (hasattr(element, 'category') and 
-                 element.category in ['Image', 'Figure']))
+        return (isinstance(element, UnstructuredImage) or
+                getattr(element, 'category', None) in _IMAGE_CATEGORIES)
     
     @classmethod
     def _classify_table(cls, element: Table, elements: List[Element],
-                       element_index: int, page: int) -> str:
+                       element_index: int, page: int,
+                       captions: Optional[CaptionIndex] = None) -> str:
         """Classify Table element based on context and characteristics."""
         # Use CaptionExtractor for extract_all_elements.py compatibility
-        caption_info = CaptionExtractor.find_for_element(
-            elements, element_index, page
-        )
+        if captions is not None:
+            caption_info = captions.find_for_element(element_index, page)
+        else:
+            caption_info = CaptionExtractor.find_for_element(
+                elements, element_index, page
+            )
         
         if caption_info.caption_type == 'figure':
             return 'figure'
@@ -58,10 +100,9 @@ class ElementClassifier:
     def _classify_by_characteristics(cls, element: Table, 
                                    description: Optional[str]) -> str:
         """Classify based on size and content characteristics."""
-        bbox = BoundingBoxCalculator.extract_from_element(element)
-        if bbox and bbox.width > 900 and bbox.height > 600:
-            if description and any(word in description for word in 
-                                 CaptionKeywords.PANEL_KEYWORDS):
+        dimensions = BoundingBoxOperations.raw_dimensions(element)
+        if dimensions and dimensions[0] > 900 and dimensions[1] > 600:
+            if description and CaptionKeywords.PANEL_MATCHER.search(description):
                 return 'figure'
         
         content = str(element)
@@ -73,10 +114,13 @@ class ElementClassifier:
     @classmethod
     def _appears_to_be_diagram(cls, content: str) -> bool:
         """Check if content appears to be a labeled diagram."""
-        import re
-        if re.search(r'\b\d+\s+\d+\s+\d+\s+\d+\b', content):
-            single_digits = re.findall(r'\b\d\b', content)
-            return len(single_digits) > 10
+        if _DIAGRAM_QUAD_RE.search(content):
+            # Stop counting as soon as the threshold is exceeded
+            count = 0
+            for _ in _SINGLE_DIGIT_RE.finditer(content):
+                count += 1
+                if count > 10:
+                    return True
         return False
 
 
@@ -98,8 +142,8 @@ class ElementClassifierHybrid:
     @classmethod
     def _is_image_element(cls, element: Element) -> bool:
         """Check if element is an image/figure."""
-        return (isinstance(element, UnstructuredImage) or 
-                (hasattr(element, 'category') and element.category in ['Image', 'Figure']))
+        return (isinstance(element, UnstructuredImage) or
+                getattr(element, 'category', None) in _IMAGE_CATEGORIES)
     
     @classmethod
     def _classify_table_element(cls, element: Table, elements: List[Element], 
@@ -119,18 +163,19 @@ class ElementClassifierHybrid:
     @classmethod
     def _classify_by_characteristics(cls, element: Table, description: Optional[str]) -> ElementType:
         """Classify based on size and content characteristics."""
-        bounding_box = BoundingBoxOperations.create_from_element(element)
-        if not bounding_box:
+        dimensions = BoundingBoxOperations.raw_dimensions(element)
+        if not dimensions:
             return ElementType.TABLE
         
         # Large elements without table captions might be figures
-        if bounding_box.width > 900 and bounding_box.height > 600:
-            if description and any(word in description for word in 
-                                 CaptionKeywords.PANEL_KEYWORDS):
+        width, height = dimensions
+        if width > 900 and height > 600:
+            if description and CaptionKeywords.PANEL_MATCHER.search(description):
                 return ElementType.FIGURE
         
         # Check for diagram-like content patterns
-        if cls._has_diagram_pattern(str(element)):
+        content = str(element)
+        if cls._has_diagram_pattern(content):
             return ElementType.FIGURE
         
         return ElementType.TABLE
@@ -138,10 +183,12 @@ class ElementClassifierHybrid:
     @classmethod
     def _has_diagram_pattern(cls, content: str) -> bool:
         """Check if content has patterns typical of labeled diagrams."""
-        import re
-        
-        if re.search(r'\b\d+\s+\d+\s+\d+\s+\d+\b', content):
-            single_digits = re.findall(r'\b\d\b', content)
-            return len(single_digits) > 10
+        if _DIAGRAM_QUAD_RE.search(content):
+            # Stop counting as soon as the threshold is exceeded
+            count = 0
+            for _ in _SINGLE_DIGIT_RE.finditer(content):
+                count += 1
+                if count > 10:
+                    return True
         
         return False
\ No newline at end of file
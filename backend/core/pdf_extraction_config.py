@@ -3,6 +3,7 @@ Configuration module for PDF extraction system.
 Contains all constants and configuration values used across the extraction pipeline.
 """
 
+import re
 from enum import Enum
 
 
@@ -25,12 +26,17 @@ class PDFConstants:
     # Coordinate scaling factors
     UNSTRUCTURED_TO_PYMUPDF_SCALE = 0.36  # Scale from Unstructured to PyMuPDF coordinates
     HIGH_RES_TO_FAST_SCALE = 1.0 / 2.78  # Scale from high-res to fast mode coordinates
+    FAST_TO_HIGH_RES_SCALE = 2.78  # Scale from fast mode to high-res coordinates
     COORDINATE_SCALE_FACTOR = 0.36  # Legacy alias for UNSTRUCTURED_TO_PYMUPDF_SCALE
     
     # DPI settings
     DEFAULT_DPI = 150
     HIGH_DPI = 300  # Used in extract_all_elements.py as default
     
+    # zlib level for rendered crop PNGs; much faster to encode than PIL's default of 6
+    # for slightly larger files
+    PNG_COMPRESS_LEVEL = 1
+    
     # Size thresholds for figures
     MIN_FIGURE_WIDTH = 100
     MIN_FIGURE_HEIGHT = 100
@@ -44,15 +50,52 @@ class PDFConstants:
     CONTAINMENT_TOLERANCE = 5.0  # Legacy alias for BBOX_TOLERANCE
 
 
+class KeywordMatcher:
+    """Tests whether any of a fixed set of literal keywords occurs in a text.
+    
+    All keywords are matched in a single pass over the text, using a
+    pyahocorasick automaton when it is installed and a compiled regex
+    alternation otherwise.
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        self._automaton = None
+        self._pattern = None
+        
+        try:
+            import ahocorasick
+        except ImportError:
+            self._pattern = re.compile('|'.join(map(re.escape, self.keywords)))
+            return
+        
+        self._automaton = ahocorasick.Automaton()
+        for keyword in self.keywords:
+            self._automaton.add_word(keyword, keyword)
+        self._automaton.make_automaton()
+    
+    def search(self, text: str) -> bool:
+        """Check if any keyword occurs in text."""
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+        return self._pattern.search(text) is not None
+
+
 class CaptionKeywords:
     """Keywords used for caption detection and classification."""
     
-    FIGURE_KEYWORDS = ['図', 'Figure', 'Fig.', 'Image', 'Diagram']
-    TABLE_KEYWORDS = ['table', '表', 'テーブル', 'tab.', 'tbl']
-    DESCRIPTION_KEYWORDS = ['図', 'Figure', 'table', '表', 'Table']
+    FIGURE_KEYWORDS = ('図', 'Figure', 'Fig.', 'Image', 'Diagram')
+    TABLE_KEYWORDS = ('table', '表', 'テーブル', 'tab.', 'tbl')
+    DESCRIPTION_KEYWORDS = ('図', 'Figure', 'table', '表', 'Table')
     
     # Additional keywords for classification
-    PANEL_KEYWORDS = ['panel', 'パネル', 'diagram', '図', 'Figure']
+    PANEL_KEYWORDS = ('panel', 'パネル', 'diagram', '図', 'Figure')
+    
+    # Single-pass matchers for each keyword set
+    FIGURE_MATCHER = KeywordMatcher(FIGURE_KEYWORDS)
+    TABLE_MATCHER = KeywordMatcher(TABLE_KEYWORDS)
+    DESCRIPTION_MATCHER = KeywordMatcher(DESCRIPTION_KEYWORDS)
+    PANEL_MATCHER = KeywordMatcher(PANEL_KEYWORDS)
 
 
 class FileExtensions:
@@ -3,11 +3,15 @@ Data models and structures for PDF extraction system.
 Contains dataclasses and helper structures used across the extraction pipeline.
 """
 
-from dataclasses import dataclass
-from typing import Optional, Dict, List, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Any, Sequence
 
+import numpy as np
 
-@dataclass
+from core.pdf_extraction_config import PDFConstants
+
+
+@dataclass(slots=True, frozen=True)
 class BoundingBox:
     """Represents a bounding box with coordinates and computed properties."""
     
@@ -15,16 +19,14 @@ class BoundingBox:
     y_min: float
     x_max: float
     y_max: float
+    width: float = field(init=False, repr=False, compare=False)
+    height: float = field(init=False, repr=False, compare=False)
+    _dict: Optional[Dict[str, float]] = field(default=None, init=False, repr=False, compare=False)
     
-    @property
-    def width(self) -> float:
-        """Calculate width of the bounding box."""
-        return self.x_max - self.x_min
-    
-    @property
-    def height(self) -> float:
-        """Calculate height of the bounding box."""
-        return self.y_max - self.y_min
+    def __post_init__(self) -> None:
+        """Precompute width and height (instances are immutable)."""
+        object.__setattr__(self, 'width', self.x_max - self.x_min)
+        object.__setattr__(self, 'height', self.y_max - self.y_min)
     
     @property
     def area(self) -> float:
@@ -32,15 +34,21 @@ class BoundingBox:
         return self.width * self.height
     
     def to_dict(self) -> Dict[str, float]:
-        """Convert bounding box to dictionary format."""
-        return {
-            "x0": round(self.x_min, 2),
-            "y0": round(self.y_min, 2),
-            "x1": round(self.x_max, 2),
-            "y1": round(self.y_max, 2),
-            "width": round(self.width, 2),
-            "height": round(self.height, 2)
-        }
+        """Convert bounding box to dictionary format.
+        
+        The rounded values are computed on first use; callers get their own
+        copy so mutating the result cannot affect the box.
+        """
+        if self._dict is None:
+            object.__setattr__(self, '_dict', {
+                "x0": round(self.x_min, 2),
+                "y0": round(self.y_min, 2),
+                "x1": round(self.x_max, 2),
+                "y1": round(self.y_max, 2),
+                "width": round(self.width, 2),
+                "height": round(self.height, 2)
+            })
+        return self._dict.copy()
     
     @classmethod
     def from_dict(cls, data: Dict[str, float]) -> 'BoundingBox':
@@ -53,49 +61,117 @@ class BoundingBox:
         )
 
 
+@dataclass(slots=True)
+class BoundingBoxArray:
+    """Structure-of-arrays view over many bounding boxes for vectorized checks.
+    
+    Coordinates are kept as float64 so results match the scalar
+    BoundingBoxOperations checks exactly.
+    """
+    
+    x_min: np.ndarray
+    y_min: np.ndarray
+    x_max: np.ndarray
+    y_max: np.ndarray
+    
+    @classmethod
+    def from_boxes(cls, boxes: Sequence[BoundingBox]) -> 'BoundingBoxArray':
+        """Create an array view from a sequence of BoundingBox instances."""
+        coordinates = np.array(
+            [(box.x_min, box.y_min, box.x_max, box.y_max) for box in boxes],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        return cls(*(np.ascontiguousarray(column) for column in coordinates.T))
+    
+    def __len__(self) -> int:
+        return len(self.x_min)
+    
+    def take(self, indices: np.ndarray) -> 'BoundingBoxArray':
+        """Return the boxes at the given indices (repeats allowed) as a new array."""
+        return BoundingBoxArray(self.x_min[indices], self.y_min[indices],
+                                self.x_max[indices], self.y_max[indices])
+    
+    @property
+    def width(self) -> np.ndarray:
+        """Widths of all bounding boxes."""
+        return self.x_max - self.x_min
+    
+    @property
+    def height(self) -> np.ndarray:
+        """Heights of all bounding boxes."""
+        return self.y_max - self.y_min
+    
+    @property
+    def area(self) -> np.ndarray:
+        """Areas of all bounding boxes."""
+        return self.width * self.height
+    
+    def contains(self, other, tolerance: float = PDFConstants.BBOX_TOLERANCE) -> np.ndarray:
+        """Mask of boxes that contain `other` (a BoundingBox or a broadcastable array)."""
+        return ((other.x_min >= self.x_min - tolerance) &
+                (other.y_min >= self.y_min - tolerance) &
+                (other.x_max <= self.x_max + tolerance) &
+                (other.y_max <= self.y_max + tolerance))
+    
+    def is_within(self, outer, tolerance: float = PDFConstants.BBOX_TOLERANCE) -> np.ndarray:
+        """Mask of boxes contained within `outer` (a BoundingBox or a broadcastable array)."""
+        return ((self.x_min >= outer.x_min - tolerance) &
+                (self.y_min >= outer.y_min - tolerance) &
+                (self.x_max <= outer.x_max + tolerance) &
+                (self.y_max <= outer.y_max + tolerance))
+    
+    def adjacent_to(self, other, max_gap: float = PDFConstants.MAX_ADJACENCY_GAP) -> np.ndarray:
+        """Mask of boxes adjacent to `other` within max_gap distance."""
+        vertical_gap = np.minimum(np.abs(self.y_min - other.y_max), np.abs(other.y_min - self.y_max))
+        horizontal_gap = np.minimum(np.abs(self.x_min - other.x_max), np.abs(other.x_min - self.x_max))
+        
+        has_horizontal_overlap = ~((self.x_max < other.x_min) | (other.x_max < self.x_min))
+        has_vertical_overlap = ~((self.y_max < other.y_min) | (other.y_max < self.y_min))
+        
+        return (((vertical_gap <= max_gap) & has_horizontal_overlap) |
+                ((horizontal_gap <= max_gap) & has_vertical_overlap))
+
+
 # Alternative naming for backward compatibility
-@dataclass  
-class BoundingBoxLegacy:
+class BoundingBoxLegacy(BoundingBox):
     """Legacy BoundingBox with different property names."""
     
-    x0: float
-    y0: float
-    x1: float
-    y1: float
+    __slots__ = ()
+    
+    def __init__(self, x0: float, y0: float, x1: float, y1: float):
+        super().__init__(x_min=x0, y_min=y0, x_max=x1, y_max=y1)
     
     @property
-    def width(self) -> float:
-        return self.x1 - self.x0
+    def x0(self) -> float:
+        return self.x_min
     
     @property
-    def height(self) -> float:
-        return self.y1 - self.y0
+    def y0(self) -> float:
+        return self.y_min
     
     @property
-    def area(self) -> float:
-        return self.width * self.height
+    def x1(self) -> float:
+        return self.x_max
     
-    def to_dict(self) -> Dict[str, float]:
-        return {
-            "x0": round(self.x0, 2),
-            "y0": round(self.y0, 2),
-            "x1": round(self.x1, 2),
-            "y1": round(self.y1, 2),
-            "width": round(self.width, 2),
-            "height": round(self.height, 2)
-        }
+    @property
+    def y1(self) -> float:
+        return self.y_max
     
-    def to_standard(self) -> BoundingBox:
-        """Convert to standard BoundingBox format."""
-        return BoundingBox(
-            x_min=self.x0,
-            y_min=self.y0,
-            x_max=self.x1,
-            y_max=self.y1
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'BoundingBoxLegacy':
+        return cls(
+            x0=data.get('x0', 0),
+            y0=data.get('y0', 0),
+            x1=data.get('x1', 0),
+            y1=data.get('y1', 0)
         )
+    
+    def to_standard(self) -> BoundingBox:
+        """Convert to standard BoundingBox format (already one)."""
+        return self
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ElementMetadata:
     """Metadata for extracted visual elements (figures/tables)."""
     
@@ -111,7 +187,7 @@ class ElementMetadata:
     element_id: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TextElement:
     """Represents a text element extracted from PDF."""
     
@@ -123,7 +199,39 @@ class TextElement:
     original_type: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
+class TextElementBatch:
+    """Columnar view over text elements for vectorized spatial filtering.
+    
+    Elements without a bounding box get NaN coordinates, so every
+    containment comparison against them is False.
+    """
+    
+    elements: List[TextElement]
+    boxes: BoundingBoxArray
+    pages: np.ndarray
+    
+    @classmethod
+    def from_elements(cls, elements: Sequence[TextElement]) -> 'TextElementBatch':
+        """Build the column arrays from a sequence of TextElement instances."""
+        count = len(elements)
+        coordinates = np.full((count, 4), np.nan, dtype=np.float64)
+        pages = np.empty(count, dtype=np.int32)
+        
+        for row, element in enumerate(elements):
+            pages[row] = element.page
+            box = element.bounding_box
+            if box is not None:
+                coordinates[row] = (box.x_min, box.y_min, box.x_max, box.y_max)
+        
+        boxes = BoundingBoxArray(*(np.ascontiguousarray(column) for column in coordinates.T))
+        return cls(list(elements), boxes, pages)
+    
+    def __len__(self) -> int:
+        return len(self.elements)
+
+
+@dataclass(slots=True)
 class PageExtractionTask:
     """Represents a single page extraction task for parallel processing."""
     
@@ -134,7 +242,7 @@ class PageExtractionTask:
     original_pdf_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CaptionInfo:
     """Information about element captions and descriptions."""
     
@@ -144,7 +252,18 @@ class CaptionInfo:
     caption_type: str
 
 
-@dataclass
+@dataclass(slots=True)
+class RenderJob:
+    """A figure/table region to crop, planned before any page is rendered."""
+    
+    page: int
+    bbox: BoundingBox
+    output_path: str
+    metadata: Dict[str, Any]
+    rendered: bool = False
+
+
+@dataclass(slots=True)
 class ElementInfo:
     """Information about a visual element for processing."""
     
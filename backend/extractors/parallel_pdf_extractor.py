@@ -8,18 +8,32 @@ import sys
 import tempfile
 from pathlib import Path
 from typing import List, Dict, Any
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from multiprocessing import cpu_count
 
+from tqdm import tqdm
+
 # Import from refactored modules
 from core.pdf_extraction_config import PDFConstants
 from core.pdf_extraction_models import PageExtractionTask
+from utils import json_utils
 from utils.file_manager import PDFFileManager, PDFPageSplitter
 from utils.parallel_combiner import ParallelResultCombiner
 from output.markdown_generator import ParallelMarkdownGenerator
 from .pdf_hybrid_extractor import HybridPDFExtractor
 
 
+# Extractor class bound once per worker process by _init_worker
+_hybrid_extractor_class = None
+
+
+def _init_worker() -> None:
+    """Import the hybrid extractor once when a worker process starts."""
+    global _hybrid_extractor_class
+    from extractors.pdf_hybrid_extractor import HybridPDFExtractor as extractor_class
+    _hybrid_extractor_class = extractor_class
+
+
 def process_single_page(task: PageExtractionTask) -> Dict[str, Any]:
     """Process a single page extraction task.
     
@@ -30,10 +44,9 @@ def process_single_page(task: PageExtractionTask) -> Dict[str, Any]:
         page_output_dir = os.path.join(task.output_dir, f"page_{task.page_number}")
         os.makedirs(page_output_dir, exist_ok=True)
         
-        # Extract using existing hybrid extractor
-        # Import here since this runs in a subprocess
-        from extractors.pdf_hybrid_extractor import HybridPDFExtractor
-        extractor = HybridPDFExtractor(
+        # Extract using existing hybrid extractor (warmed up by _init_worker)
+        extractor_class = _hybrid_extractor_class or HybridPDFExtractor
+        extractor = extractor_class(
             pdf_path=task.pdf_path,
             output_directory=page_output_dir,
             dpi=task.dpi
@@ -46,30 +59,23 @@ def process_single_page(task: PageExtractionTask) -> Dict[str, Any]:
                     .filter_text_within_visuals()
                     .match_detection_probabilities())
         
-        # Build metadata for this page
+        # Build metadata for this page; page numbers are assigned to sections,
+        # figures and tables by ParallelResultCombiner when pages are combined
         page_metadata = extractor.structure_builder.build_metadata_structure(
             extractor.filtered_text_elements, 
             extractor.figures, 
             extractor.tables
         )
         
-        # Add page number to all elements
-        for section in page_metadata.get("structure", []):
-            section["page"] = task.page_number
-            
-            # Update page numbers in figures and tables
-            for figure in section.get("figures", []):
-                figure["page"] = task.page_number
-            for table in section.get("tables", []):
-                table["page"] = task.page_number
+        # Write the page result next to the page PDF so only its path
+        # travels back to the parent process
+        metadata_path = os.path.splitext(task.pdf_path)[0] + ".json"
+        json_utils.dump_to_file(page_metadata, metadata_path)
         
         return {
             "page": task.page_number,
             "success": True,
-            "metadata": page_metadata,
-            "figures": extractor.figures,
-            "tables": extractor.tables,
-            "text_elements": extractor.filtered_text_elements
+            "metadata_path": metadata_path
         }
         
     except Exception as e:
@@ -77,7 +83,7 @@ def process_single_page(task: PageExtractionTask) -> Dict[str, Any]:
             "page": task.page_number,
             "success": False,
             "error": str(e),
-            "metadata": None
+            "metadata_path": None
         }
 
 
@@ -132,15 +138,25 @@ class ParallelPDFExtractor:
             # Generate final outputs
             self._generate_final_outputs(combined_metadata)
             
-            # Clean up page directories
-            self.file_manager.cleanup_page_directories(total_pages)
+            # Clean up the page directories created by the workers
+            self.file_manager.cleanup_page_directories(
+                [self.output_directory / f"page_{task.page_number}" for task in tasks]
+            )
             
             print(f"Extraction complete! Output saved to {self.output_directory}")
             
             return combined_metadata
     
     def _create_extraction_tasks(self, page_files: List[tuple]) -> List[PageExtractionTask]:
-        """Create extraction tasks for all pages."""
+        """Create extraction tasks for all pages, largest page first.
+        
+        Page file size is a cheap proxy for extraction cost; dispatching the
+        heaviest pages first (LPT scheduling) keeps a slow page from being
+        picked up last and leaving the other workers idle.
+        """
+        page_files = sorted(page_files, key=lambda page_file: os.path.getsize(page_file[1]),
+                            reverse=True)
+        
         tasks = []
         for page_num, page_path in page_files:
             task = PageExtractionTask(
@@ -157,27 +173,30 @@ class ParallelPDFExtractor:
         """Process pages in parallel using ProcessPoolExecutor."""
         page_results = []
         
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_task = {executor.submit(process_single_page, task): task 
-                             for task in tasks}
-            
-            for future in as_completed(future_to_task):
-                task = future_to_task[future]
-                try:
-                    result = future.result()
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=_init_worker) as executor, \
+                tqdm(total=total_pages, desc="Pages", unit="page") as progress:
+            try:
+                # chunksize=1 keeps the longest-first task order effective; results
+                # are only paths, so per-task IPC is small
+                for result in executor.map(process_single_page, tasks, chunksize=1):
                     page_results.append(result)
-                    
-                    if result["success"]:
-                        print(f"✓ Processed page {result['page']}/{total_pages}")
-                    else:
-                        print(f"✗ Failed page {result['page']}: {result.get('error', 'Unknown error')}")
-                except Exception as e:
-                    print(f"✗ Error processing page {task.page_number}: {e}")
-                    page_results.append({
-                        "page": task.page_number,
-                        "success": False,
-                        "error": str(e)
-                    })
+                    progress.update(1)
+            except Exception as e:
+                # A worker died; record every page without a result as failed
+                processed_pages = {result["page"] for result in page_results}
+                for task in tasks:
+                    if task.page_number not in processed_pages:
+                        page_results.append({
+                            "page": task.page_number,
+                            "success": False,
+                            "error": str(e)
+                        })
+        
+        # Report failures once, after the progress bar is closed
+        failures = [result for result in page_results if not result["success"]]
+        for failure in sorted(failures, key=lambda result: result["page"]):
+            print(f"✗ Failed page {failure['page']}: {failure.get('error', 'Unknown error')}")
         
         return page_results
     
@@ -193,6 +212,22 @@ class ParallelPDFExtractor:
         self.file_manager.save_metadata_json(combined_metadata)
 
 
+def extract_pdf(pdf_path: str, output_directory: str, max_workers: int = 4,
+                dpi: int = PDFConstants.DEFAULT_DPI) -> Dict[str, Any]:
+    """Extract one PDF with ParallelPDFExtractor and return the combined metadata.
+    
+    Module-level so it can be submitted to a process pool (the API server
+    runs extractions this way to keep its event loop free).
+    """
+    extractor = ParallelPDFExtractor(
+        pdf_path=pdf_path,
+        output_directory=output_directory,
+        max_workers=max_workers,
+        dpi=dpi
+    )
+    return extractor.extract()
+
+
 def main():
     """Main entry point for command-line usage."""
     
@@ -3,14 +3,20 @@ Refactored hybrid PDF extraction system.
 Streamlined version using extracted modules for better maintainability.
 """
 
+import io
 import os
 import sys
 import json
+import operator
+import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import numpy as np
 
-from unstructured.partition.pdf import partition_pdf
 from unstructured.documents.elements import (
     Element, 
     Image as UnstructuredImage,
@@ -22,7 +28,7 @@ from unstructured.documents.elements import (
 
 # Import from centralized modules
 from core.pdf_extraction_config import ExtractionStrategy, ElementType, PDFConstants
-from core.pdf_extraction_models import BoundingBox, ElementMetadata, TextElement
+from core.pdf_extraction_models import BoundingBox, ElementMetadata, TextElement, TextElementBatch
 from utils.bbox_operations import BoundingBoxOperations
 from utils.caption_detector import CaptionDetector
 from classifiers.element_classifier_hybrid import ElementClassifierHybrid
@@ -32,7 +38,99 @@ from processors.table_exporter import TableDataSaver
 from processors.text_processor import TextProcessor
 from output.document_structure import DocumentStructureBuilder
 from output.markdown_generator import MarkdownGenerator
-from utils.file_manager import PDFFileManager
+from utils.file_manager import PDFFileManager, PDFPageSplitter
+from utils.partition_cache import PartitionCache
+
+
+# OCR languages for both partition passes; Japanese is only requested when
+# the PDF actually contains CJK text (see detect_partition_languages)
+PARTITION_LANGUAGES = ['jpn', 'eng']
+ENGLISH_LANGUAGES = ['eng']
+LANGUAGE_PROBE_PAGES = 3
+
+# Hiragana, Katakana, CJK Unified Ideographs (+ Extension A), halfwidth Katakana
+_CJK_PATTERN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]')
+
+# C-level attribute chains for the per-element hot loops
+_PAGE_GETTER = operator.attrgetter('metadata.page_number')
+_PROBABILITY_GETTER = operator.attrgetter('metadata.detection_class_prob')
+
+
+def detect_partition_languages(pdf_bytes: bytes,
+                               probe_pages: int = LANGUAGE_PROBE_PAGES) -> List[str]:
+    """Choose OCR languages from the text layer of the first pages.
+    
+    PDFs without any text layer there (e.g. scans) keep the full language
+    list, since their script is unknown until OCR runs.
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+        probe_text = "".join(
+            document[page_index].get_text() for page_index in range(min(probe_pages, len(document)))
+        )
+    
+    if not probe_text.strip() or _CJK_PATTERN.search(probe_text):
+        return PARTITION_LANGUAGES
+    return ENGLISH_LANGUAGES
+
+
+def _high_resolution_settings(languages: Sequence[str]) -> Dict[str, Any]:
+    """partition_pdf keyword arguments (besides the file) of the high-resolution pass."""
+    return {
+        "strategy": ExtractionStrategy.HIGH_RESOLUTION.value,
+        # Figures and tables are cropped from rendered pages afterwards, so
+        # unstructured does not need to extract (and base64-encode) image blocks
+        "extract_images_in_pdf": False,
+        "include_page_breaks": True,
+        "include_metadata": True,
+        "infer_table_structure": True,
+        "languages": list(languages),
+    }
+
+
+def _fast_settings(languages: Sequence[str]) -> Dict[str, Any]:
+    """partition_pdf keyword arguments (besides the file) of the fast pass."""
+    return {
+        "strategy": ExtractionStrategy.FAST.value,
+        "include_page_breaks": True,
+        "include_metadata": True,
+        "languages": list(languages),
+    }
+
+
+def partition_high_resolution(pdf_bytes: bytes, page_offset: int = 0,
+                              languages: Sequence[str] = PARTITION_LANGUAGES) -> List[Element]:
+    """Partition PDF using high-resolution strategy.
+    
+    Module-level so it can run in a worker process.
+    
+    Args:
+        pdf_bytes: Contents of the PDF (or of a page range split from it)
+        page_offset: Number of pages preceding pdf_bytes in the original document;
+            added to every element's page number
+        languages: OCR languages passed to partition_pdf
+    """
+    # Imported lazily: loading the partitioner pulls in the layout model stack
+    from unstructured.partition.pdf import partition_pdf
+    
+    elements = partition_pdf(file=io.BytesIO(pdf_bytes), **_high_resolution_settings(languages))
+    
+    if page_offset:
+        for element in elements:
+            if getattr(element.metadata, 'page_number', None):
+                element.metadata.page_number += page_offset
+    
+    return elements
+
+
+def partition_fast(pdf_bytes: bytes,
+                   languages: Sequence[str] = PARTITION_LANGUAGES) -> List[Element]:
+    """Partition PDF using fast strategy.
+    
+    Module-level so it can run in a worker process.
+    """
+    from unstructured.partition.pdf import partition_pdf
+    
+    return partition_pdf(file=io.BytesIO(pdf_bytes), **_fast_settings(languages))
 
 
 class HybridPDFExtractor:
@@ -41,10 +139,18 @@ class HybridPDFExtractor:
     with fast text extraction.
     """
     
+    # Element types never stored as text, per partition pass
+    _HIGH_RESOLUTION_EXCLUDED_TYPES = (UnstructuredImage, Table, PageBreak, Footer, Header)
+    _FAST_EXCLUDED_TYPES = (Footer, Header)
+    
     def __init__(self, pdf_path: str, output_directory: str = "hybrid_extraction", 
                  dpi: int = PDFConstants.DEFAULT_DPI):
         self.pdf_path = pdf_path
         self.pdf_name = Path(pdf_path).stem
+        # Read once; every partition pass works from this buffer
+        self.pdf_bytes = Path(pdf_path).read_bytes()
+        # Decided once so both partition passes load the same OCR models
+        self.languages = detect_partition_languages(self.pdf_bytes)
         self.output_directory = Path(output_directory)
         self.dpi = dpi
         
@@ -65,12 +171,26 @@ class HybridPDFExtractor:
         self.figures: List[ElementMetadata] = []
         self.tables: List[ElementMetadata] = []
         self.fast_text_elements: List[TextElement] = []
+        self.fast_text_batch: Optional[TextElementBatch] = None
         self.filtered_text_elements: List[TextElement] = []
         self.high_resolution_text_elements: List[TextElement] = []
     
-    def extract_figures_and_tables(self) -> 'HybridPDFExtractor':
-        """Extract figures and tables using high-resolution mode."""
-        elements = self._partition_pdf_high_resolution()
+    def has_visual_elements(self) -> bool:
+        """Cheap probe for embedded images or vector drawings on any page.
+        
+        Scanned pages are images, so they always count as having visuals.
+        """
+        with fitz.open(stream=self.pdf_bytes, filetype="pdf") as document:
+            return any(page.get_images() or page.get_cdrawings() for page in document)
+    
+    def extract_figures_and_tables(self, elements: Optional[List[Element]] = None) -> 'HybridPDFExtractor':
+        """Extract figures and tables using high-resolution mode.
+        
+        Args:
+            elements: Result of partition_high_resolution, if it was already run
+        """
+        if elements is None:
+            elements = self._partition_pdf_high_resolution()
         self._store_high_resolution_text_elements(elements)
         
         figures_tables_metadata = self._extract_visual_elements(elements)
@@ -80,67 +200,78 @@ class HybridPDFExtractor:
     
     def _partition_pdf_high_resolution(self) -> List[Element]:
         """Partition PDF using high-resolution strategy."""
-        return partition_pdf(
-            filename=self.pdf_path,
-            strategy=ExtractionStrategy.HIGH_RESOLUTION.value,
-            extract_images_in_pdf=True,
-            extract_image_block_types=["Table", "Image", "Figure", "FigureCaption"],
-            extract_image_block_to_payload=True,
-            include_page_breaks=True,
-            include_metadata=True,
-            infer_table_structure=True,
-            languages=['jpn', 'eng']
-        )
+        return partition_high_resolution(self.pdf_bytes, languages=self.languages)
     
     def _store_high_resolution_text_elements(self, elements: List[Element]) -> None:
         """Store high-resolution text elements for probability matching."""
+        self.high_resolution_text_elements.extend(
+            self._collect_text_elements(elements, self._HIGH_RESOLUTION_EXCLUDED_TYPES)
+        )
+    
+    @staticmethod
+    def _collect_text_elements(elements: List[Element], excluded_types: Tuple[type, ...]) -> List[TextElement]:
+        """Create TextElements for non-empty elements, tracking the current page.
+        
+        Runs once per element of every partition pass, so page tracking is
+        inlined and globals are bound to locals. Raw bounds are gathered in the
+        loop and scaled to hi-res coordinates in a single array operation.
+        The per-element buffers are sized up front (at most one entry per
+        element) and truncated afterwards.
+        """
+        fields = [None] * len(elements)
+        raw_bounds = [None] * len(elements)
+        count = 0
+        page_getter = _PAGE_GETTER
+        probability_getter = _PROBABILITY_GETTER
+        get_raw_bounds = BoundingBoxOperations.raw_bounds
+        page_break_class = PageBreak
         current_page = 1
         
         for element in elements:
-            if isinstance(element, PageBreak):
+            if isinstance(element, page_break_class):
                 current_page += 1
                 continue
             
-            current_page = self._update_current_page(element, current_page)
+            try:
+                current_page = page_getter(element) or current_page
+            except AttributeError:
+                pass
             
-            if self._should_store_text_element(element):
-                text_element = self._create_text_element(element, current_page)
-                if text_element:
-                    self.high_resolution_text_elements.append(text_element)
-    
-    def _update_current_page(self, element: Element, current_page: int) -> int:
-        """Update current page number from element metadata."""
-        if (hasattr(element, 'metadata') and hasattr(element.metadata, 'page_number') 
-            and element.metadata.page_number):
-            return element.metadata.page_number
-        return current_page
-    
-    def _should_store_text_element(self, element: Element) -> bool:
-        """Check if element should be stored as text element."""
-        return (not isinstance(element, (UnstructuredImage, Table, PageBreak, Footer, Header)) 
-                and str(element).strip())
-    
-    def _create_text_element(self, element: Element, page: int) -> Optional[TextElement]:
-        """Create TextElement from unstructured element."""
-        text = str(element).strip()
-        if not text:
-            return None
-        
-        # Scale fast mode coordinates to hi-res coordinates (multiply by 2.78)
-        bounding_box = BoundingBoxOperations.create_from_element(element, scale_to_hires=True)
-        detection_probability = None
+            if isinstance(element, excluded_types):
+                continue
+            
+            text = str(element).strip()
+            if not text:
+                continue
+            
+            try:
+                detection_probability = probability_getter(element)
+            except AttributeError:
+                detection_probability = None
+            
+            fields[count] = (type(element).__name__, text, current_page, detection_probability)
+            raw_bounds[count] = get_raw_bounds(element)
+            count += 1
         
-        if (hasattr(element, 'metadata') and 
-            hasattr(element.metadata, 'detection_class_prob')):
-            detection_probability = element.metadata.detection_class_prob
+        del fields[count:]
+        del raw_bounds[count:]
         
-        return TextElement(
-            element_type=type(element).__name__,
-            text=text,
-            page=page,
-            bounding_box=bounding_box,
-            detection_probability=detection_probability
+        # Scale fast mode coordinates to hi-res coordinates (multiply by 2.78)
+        bounding_boxes = BoundingBoxOperations.create_many_from_bounds(
+            raw_bounds, PDFConstants.FAST_TO_HIGH_RES_SCALE
         )
+        
+        return [
+            TextElement(
+                element_type=element_type,
+                text=text,
+                page=page,
+                bounding_box=bounding_box,
+                detection_probability=detection_probability
+            )
+            for (element_type, text, page, detection_probability), bounding_box
+            in zip(fields, bounding_boxes)
+        ]
     
     def _extract_visual_elements(self, elements: List[Element]) -> Dict[str, List[Dict]]:
         """Extract visual elements using refactored logic."""
@@ -153,33 +284,35 @@ class HybridPDFExtractor:
         
         return extractor.extract(
             pdf_path=self.pdf_path,
-            strategy=ExtractionStrategy.HIGH_RESOLUTION.value
+            strategy=ExtractionStrategy.HIGH_RESOLUTION.value,
+            file=io.BytesIO(self.pdf_bytes)
         )
     
     def _apply_size_filtering(self, metadata: Dict[str, List[Dict]]) -> None:
-        """Apply size filtering to remove small figures."""
-        filtered_figures = []
+        """Apply size filtering to remove small figures.
         
-        for figure in metadata["figures"]:
-            if self._should_keep_figure(figure):
-                filtered_figures.append(figure)
+        Figures without a bounding box are always kept.
+        """
+        figures = metadata["figures"]
+        figure_count = len(figures)
         
-        self.figures = [self._convert_to_element_metadata(fig, "figure") for fig in filtered_figures]
+        bounding_boxes = [figure.get('bounding_box') or {} for figure in figures]
+        widths = np.fromiter((bbox.get('width', 0) for bbox in bounding_boxes),
+                             dtype=np.float64, count=figure_count)
+        heights = np.fromiter((bbox.get('height', 0) for bbox in bounding_boxes),
+                              dtype=np.float64, count=figure_count)
+        has_bounding_box = np.fromiter((bool(bbox) for bbox in bounding_boxes),
+                                       dtype=bool, count=figure_count)
+        
+        # Non-short-circuiting form: one fused compare/or/and pass over the arrays
+        keep = ((((widths >= PDFConstants.MIN_FIGURE_WIDTH) | (heights >= PDFConstants.MIN_FIGURE_HEIGHT))
+                 & (widths * heights >= PDFConstants.MIN_FIGURE_AREA))
+                | ~has_bounding_box)
+        
+        self.figures = [self._convert_to_element_metadata(figures[index], "figure")
+                        for index in keep.nonzero()[0]]
         self.tables = [self._convert_to_element_metadata(tbl, "table") for tbl in metadata["tables"]]
     
-    def _should_keep_figure(self, figure: Dict) -> bool:
-        """Check if figure meets minimum size requirements."""
-        bounding_box_dict = figure.get('bounding_box')
-        if not bounding_box_dict:
-            return True
-        
-        width = bounding_box_dict.get('width', 0)
-        height = bounding_box_dict.get('height', 0)
-        area = width * height
-        
-        return not ((width < PDFConstants.MIN_FIGURE_WIDTH and height < PDFConstants.MIN_FIGURE_HEIGHT) 
-                   or area < PDFConstants.MIN_FIGURE_AREA)
-    
     def _convert_to_element_metadata(self, element_dict: Dict, element_type: str) -> ElementMetadata:
         """Convert dictionary metadata to ElementMetadata object."""
         bounding_box = None
@@ -205,38 +338,27 @@ class HybridPDFExtractor:
             element_id=element_dict.get('element_id')
         )
     
-    def extract_text_fast_mode(self) -> 'HybridPDFExtractor':
-        """Extract text using fast mode for cleaner results."""
-        elements = partition_pdf(
-            filename=self.pdf_path,
-            strategy=ExtractionStrategy.FAST.value,
-            include_page_breaks=True,
-            include_metadata=True,
-            languages=['jpn', 'eng']
-        )
+    def extract_text_fast_mode(self, elements: Optional[List[Element]] = None) -> 'HybridPDFExtractor':
+        """Extract text using fast mode for cleaner results.
         
-        current_page = 1
+        Args:
+            elements: Result of partition_fast, if it was already run
+        """
+        if elements is None:
+            elements = partition_fast(self.pdf_bytes, self.languages)
         
-        for element in elements:
-            if isinstance(element, PageBreak):
-                current_page += 1
-                continue
-            
-            current_page = self._update_current_page(element, current_page)
-            
-            if isinstance(element, (Footer, Header)):
-                continue
-            
-            text_element = self._create_text_element(element, current_page)
-            if text_element:
-                self.fast_text_elements.append(text_element)
+        self.fast_text_elements.extend(
+            self._collect_text_elements(elements, self._FAST_EXCLUDED_TYPES)
+        )
+        self.fast_text_batch = TextElementBatch.from_elements(self.fast_text_elements)
         
         return self
     
     def filter_text_within_visuals(self) -> 'HybridPDFExtractor':
         """Filter out text elements that are inside figures or tables."""
         self.filtered_text_elements = self.text_processor.filter_text_within_visuals(
-            self.fast_text_elements, self.figures, self.tables
+            self.fast_text_batch if self.fast_text_batch is not None else self.fast_text_elements,
+            self.figures, self.tables
         )
         return self
     
@@ -274,16 +396,113 @@ class ExtractionOrchestrator:
     
     @staticmethod
     def execute_extraction(pdf_path: str, output_directory: str = "hybrid_extraction", 
-                          dpi: int = PDFConstants.DEFAULT_DPI) -> HybridPDFExtractor:
-        """Execute complete extraction workflow."""
+                          dpi: int = PDFConstants.DEFAULT_DPI,
+                          max_workers: Optional[int] = None,
+                          use_cache: bool = False,
+                          skip_high_resolution_without_visuals: bool = False) -> HybridPDFExtractor:
+        """Execute complete extraction workflow.
+        
+        Args:
+            use_cache: Reuse partition results stored for an identical PDF
+                (see PartitionCache) and store new ones. Off by default: the
+                cache keeps document contents on disk after the extraction
+            skip_high_resolution_without_visuals: Run only the fast pass when the
+                PDF has no images or vector drawings at all. Off by default:
+                borderless tables made of plain text are not detected by the
+                probe, and text loses hi-res classification.
+        """
         extractor = HybridPDFExtractor(pdf_path, output_directory, dpi)
         
+        if skip_high_resolution_without_visuals and not extractor.has_visual_elements():
+            print("No images or drawings found; skipping high-resolution partition")
+            fast_elements = ExtractionOrchestrator._partition_fast_only(
+                extractor.pdf_bytes, extractor.languages, use_cache
+            )
+            return (extractor
+                    .extract_text_fast_mode(fast_elements)
+                    .filter_text_within_visuals()
+                    .match_detection_probabilities()
+                    .generate_markdown_output())
+        
+        high_resolution_elements, fast_elements = ExtractionOrchestrator._partition(
+            extractor.pdf_bytes, extractor.languages, max_workers, use_cache
+        )
+        
         return (extractor
-                .extract_figures_and_tables()
-                .extract_text_fast_mode()
+                .extract_figures_and_tables(high_resolution_elements)
+                .extract_text_fast_mode(fast_elements)
                 .filter_text_within_visuals()
                 .match_detection_probabilities()
                 .generate_markdown_output())
+    
+    @staticmethod
+    def _partition(pdf_bytes: bytes, languages: Sequence[str], max_workers: Optional[int],
+                   use_cache: bool) -> Tuple[List[Element], List[Element]]:
+        """Return (high_resolution_elements, fast_elements), from the cache when possible."""
+        if not use_cache:
+            return ExtractionOrchestrator._partition_concurrently(pdf_bytes, languages, max_workers)
+        
+        cache = PartitionCache(pdf_bytes)
+        high_resolution_settings = _high_resolution_settings(languages)
+        fast_settings = _fast_settings(languages)
+        
+        high_resolution_elements = cache.load(high_resolution_settings)
+        fast_elements = cache.load(fast_settings)
+        if high_resolution_elements is not None and fast_elements is not None:
+            print("Using cached partition results")
+            return high_resolution_elements, fast_elements
+        
+        high_resolution_elements, fast_elements = ExtractionOrchestrator._partition_concurrently(
+            pdf_bytes, languages, max_workers
+        )
+        cache.store(high_resolution_settings, high_resolution_elements)
+        cache.store(fast_settings, fast_elements)
+        
+        return high_resolution_elements, fast_elements
+    
+    @staticmethod
+    def _partition_fast_only(pdf_bytes: bytes, languages: Sequence[str],
+                             use_cache: bool) -> List[Element]:
+        """Return fast partition elements, from the cache when possible."""
+        fast_settings = _fast_settings(languages)
+        cache = PartitionCache(pdf_bytes) if use_cache else None
+        
+        fast_elements = cache.load(fast_settings) if cache else None
+        if fast_elements is None:
+            fast_elements = partition_fast(pdf_bytes, languages)
+            if cache:
+                cache.store(fast_settings, fast_elements)
+        
+        return fast_elements
+    
+    @staticmethod
+    def _partition_concurrently(pdf_bytes: bytes, languages: Sequence[str],
+                                max_workers: Optional[int] = None) -> Tuple[List[Element], List[Element]]:
+        """Run the independent high-resolution and fast partitions in worker processes.
+        
+        The high-resolution pass dominates runtime, so the PDF is split into
+        consecutive page ranges that are partitioned in parallel and merged
+        back in page order.
+        """
+        max_workers = max(2, max_workers or os.cpu_count() or 2)
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            fast_future = executor.submit(partition_fast, pdf_bytes, languages)
+            
+            page_ranges = PDFPageSplitter.split_pdf_ranges(pdf_bytes, max_workers - 1)
+            high_resolution_futures = [
+                executor.submit(partition_high_resolution, range_bytes, page_offset, languages)
+                for page_offset, range_bytes in page_ranges
+            ]
+            
+            high_resolution_elements = []
+            for range_index, future in enumerate(high_resolution_futures):
+                if range_index:
+                    # partition_pdf only emits page breaks between pages of one range
+                    high_resolution_elements.append(PageBreak(text=""))
+                high_resolution_elements.extend(future.result())
+            
+            return high_resolution_elements, fast_future.result()
 
 
 def main() -> None:
@@ -4,11 +4,17 @@ Handles figures and tables with smart classification and merging.
 """
 
 import os
-import json
+import re
+import multiprocessing
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple, BinaryIO
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import fitz
+from tqdm import tqdm
 from unstructured.partition.pdf import partition_pdf
 from unstructured.documents.elements import (
     Element, 
@@ -17,16 +23,21 @@ from unstructured.documents.elements import (
     FigureCaption,
     Text,
     Title,
-    NarrativeText
+    NarrativeText,
+    ListItem,
+    Header,
+    Footer,
+    PageBreak
 )
 
 # Import constants from centralized config
 from core.pdf_extraction_config import PDFConstants, CaptionKeywords, FileExtensions, DirectoryNames
 # Import models - use legacy BoundingBox for backward compatibility
-from core.pdf_extraction_models import BoundingBoxLegacy as BoundingBox, CaptionInfo, ElementInfo
+from core.pdf_extraction_models import BoundingBoxLegacy as BoundingBox, CaptionInfo, ElementInfo, RenderJob
 # Import utilities
-from utils.bbox_operations import BoundingBoxCalculator
-from utils.caption_detector import CaptionExtractor
+from utils.bbox_operations import BoundingBoxCalculator, BoundingBoxOperations
+from utils.caption_detector import CaptionIndex
+from utils import json_utils
 from classifiers.element_classifier_simple import ElementClassifier
 from processors.element_preprocessor import ElementProcessor
 from processors.image_extractor import ImageExtractor
@@ -38,13 +49,51 @@ MIN_FIGURE_WIDTH = PDFConstants.MIN_FIGURE_WIDTH
 MIN_FIGURE_HEIGHT = PDFConstants.MIN_FIGURE_HEIGHT
 MIN_FIGURE_AREA = PDFConstants.MIN_FIGURE_AREA
 DEFAULT_DPI = PDFConstants.HIGH_DPI  # Note: extract_all_elements uses 300 DPI by default
+PNG_COMPRESS_LEVEL = PDFConstants.PNG_COMPRESS_LEVEL
 CAPTION_SEARCH_RANGE = PDFConstants.CAPTION_SEARCH_RANGE
 ADJACENCY_THRESHOLD = PDFConstants.ADJACENCY_THRESHOLD
 CONTAINMENT_TOLERANCE = PDFConstants.CONTAINMENT_TOLERANCE
 
+# Heading detection, compiled once for the per-element text classification
+HEADING_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'^第\s*\d+\s*章',
+    r'^Chapter\s+\d+',
+    r'^Section\s+\d+',
+    r'^\d+\.\s+[A-Z]',
+    r'^[A-Z][^.!?]*$'
+))
+HEADING_LEVEL_1_PATTERN = re.compile(r'^第\s*\d+\s*章|^Chapter\s+\d+')
+HEADING_LEVEL_2_PATTERN = re.compile(r'^\d+\.\s+')
+
+# Text element labels in isinstance priority order; plain Text (and any other
+# Text subclass) is labelled by heading detection on its content
+TEXT_TYPE_LABELS = (
+    (Title, "title"),
+    (Header, "header"),
+    (Footer, "footer"),
+    (ListItem, "list_item"),
+    (NarrativeText, "paragraph"),
+)
+_HEADING_CANDIDATE = "heading_candidate"
+# Resolved label per concrete element class, filled on first sight of each class
+_TEXT_TYPE_BY_CLASS: Dict[type, str] = {}
+
+# How _extract_text_elements treats each element class, resolved once per class
+_ROLE_SKIP = 0
+_ROLE_PAGE_BREAK = 1
+_ROLE_TEXT = 2
+_SKIPPED_TEXT_CLASSES = (UnstructuredImage, Table, FigureCaption, Header, Footer)
+_TEXT_ROLE_BY_CLASS: Dict[type, int] = {}
+_PAGE_GETTER = attrgetter('metadata.page_number')
+
+# Markdown structure prefixes
+_FIGURE_HEADING_PREFIX = "### 🖼️ Figure: "
+_TABLE_HEADING_PREFIX = "### 📋 Table: "
+_CSV_LINK_PREFIX = "[📊 Download CSV]"
+
 
 # BoundingBoxCalculator is now imported from pdf_bbox_utils
-# CaptionExtractor is now imported from pdf_caption_utils
+# CaptionIndex is now imported from utils.caption_detector
 # ElementClassifier is now imported from pdf_element_classifier
 # ElementProcessor is now imported from pdf_element_processor
 # ImageExtractor is now imported from pdf_image_extractor
@@ -53,37 +102,75 @@ CONTAINMENT_TOLERANCE = PDFConstants.CONTAINMENT_TOLERANCE
 
 class PDFElementExtractor:
     
-    def __init__(self, output_dir: str = "extracted_elements", dpi: int = DEFAULT_DPI):
+    def __init__(self, output_dir: str = "extracted_elements", dpi: int = DEFAULT_DPI,
+                 skip_existing: bool = False):
+        """
+        Args:
+            output_dir: Directory receiving figures/, tables/ and the metadata
+            dpi: Resolution of the rendered figure/table crops
+            skip_existing: Keep crop images that are at least as new as the PDF
+                instead of rendering them again (incremental re-runs)
+        """
         self.output_dir = output_dir
         self.dpi = dpi
+        self.skip_existing = skip_existing
         self.figures_dir = os.path.join(output_dir, "figures")
         self.tables_dir = os.path.join(output_dir, "tables")
+        # Directory prefixes (ending in a separator) for the per-element output files
+        self._figures_prefix = os.path.join(self.figures_dir, "")
+        self._tables_prefix = os.path.join(self.tables_dir, "")
         self._create_directories()
     
     def _create_directories(self) -> None:
         os.makedirs(self.figures_dir, exist_ok=True)
         os.makedirs(self.tables_dir, exist_ok=True)
     
-    def extract(self, pdf_path: str, strategy: str = "hi_res") -> Dict[str, List[Dict[str, Any]]]:
+    def extract(self, pdf_path: str, strategy: str = "hi_res",
+                file: Optional[BinaryIO] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Extract figures, tables and text blocks from a PDF.
+        
+        If `file` is given (an in-memory copy of pdf_path), it is partitioned
+        instead of re-reading pdf_path from disk.
+        """
         pdf_name = Path(pdf_path).stem
         
         elements = partition_pdf(
-            filename=pdf_path,
+            filename=None if file is not None else pdf_path,
+            file=file,
             strategy=strategy,
-            extract_images_in_pdf=True,
-            extract_image_block_types=["Table", "Image", "Figure", "FigureCaption"],
-            extract_image_block_to_payload=True,
+            # Figures and tables are cropped from rendered pages afterwards, so
+            # unstructured does not need to extract (and base64-encode) image blocks
+            extract_images_in_pdf=False,
             include_page_breaks=True,
             include_metadata=True,
             infer_table_structure=True
         )
         
-        preprocessed_elements = ElementProcessor.preprocess_elements(elements)
-        
-        visual_metadata = self._process_elements(
-            elements, preprocessed_elements, pdf_name, pdf_path
+        # Element kinds and caption lookups are computed once and shared by
+        # preprocessing, classification and planning
+        element_kinds = ElementClassifier.precompute_kinds(elements)
+        visual_indices = [idx for idx, kind in enumerate(element_kinds)
+                          if kind != ElementClassifier.KIND_OTHER]
+        captions = CaptionIndex(elements)
+        preprocessed_elements = ElementProcessor.preprocess_elements(
+            elements, captions, visual_indices
         )
         
+        source_mtime = self._source_mtime(pdf_path) if self.skip_existing else None
+        
+        # One parsed document serves every figure/table crop
+        if file is not None:
+            file.seek(0)
+            document = fitz.open(stream=file.read(), filetype="pdf")
+        else:
+            document = fitz.open(pdf_path)
+        
+        with document:
+            visual_metadata = self._process_elements(
+                elements, preprocessed_elements, pdf_name, document, captions,
+                element_kinds, source_mtime
+            )
+        
         text_metadata = self._extract_text_elements(elements)
         
         return {
@@ -94,188 +181,281 @@ class PDFElementExtractor:
     
     def _process_elements(self, original_elements: List[Element],
                          preprocessed: List[ElementInfo], pdf_name: str,
-                         pdf_path: str) -> Dict[str, List[Dict[str, Any]]]:
-        figures_metadata = []
-        tables_metadata = []
+                         document: fitz.Document, captions: CaptionIndex,
+                         element_kinds: List[int],
+                         source_mtime: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+        figure_jobs = []
+        table_jobs = []
         figure_counter = 0
         table_counter = 0
         merged_indices = set()
+        # Built in reverse so the first entry wins for a repeated index
+        index_map = {info.index: info for info in reversed(preprocessed)}
         
+        # Phase 1: classify, merge and plan every crop (cheap, no rendering)
         for elem_info in preprocessed:
             if elem_info.skip or elem_info.index in merged_indices:
                 continue
             
             element, bbox = self._resolve_merge(
-                elem_info, preprocessed, merged_indices
+                elem_info, index_map, merged_indices
             )
             
+            # Non-table visuals always classify as figures, so undersized ones can be
+            # rejected on the merged bbox up front; the counter still advances so
+            # figure numbering is unchanged
+            if not isinstance(element, Table) and not self._is_valid_figure_size(bbox):
+                figure_counter += 1
+                continue
+            
             classification = ElementClassifier.classify(
-                element, original_elements, elem_info.index, elem_info.page
+                element, original_elements, elem_info.index, elem_info.page,
+                kinds=element_kinds, captions=captions
             )
             
             if classification == 'figure':
                 figure_counter += 1
-                metadata = self._process_figure(
+                job = self._plan_figure(
                     element, bbox, elem_info.page, figure_counter,
-                    pdf_name, pdf_path, original_elements, elem_info.index
+                    pdf_name, captions, elem_info.index
                 )
-                if metadata:
-                    figures_metadata.append(metadata)
+                if job:
+                    figure_jobs.append(job)
             
             elif classification == 'table':
                 table_counter += 1
-                metadata = self._process_table(
+                table_jobs.append(self._plan_table(
                     element, bbox, elem_info.page, table_counter,
-                    pdf_name, pdf_path, original_elements, elem_info.index
-                )
-                if metadata:
-                    tables_metadata.append(metadata)
+                    pdf_name, captions, elem_info.index
+                ))
+        
+        # Phase 2: render all crops, one page load per page
+        self._render_all_crops(document, figure_jobs + [job for job in table_jobs if job.bbox],
+                               source_mtime)
         
-        return {"figures": figures_metadata, "tables": tables_metadata}
+        for job in table_jobs:
+            if job.rendered:
+                job.metadata["files"].append(os.path.basename(job.output_path))
+        
+        return {
+            "figures": [job.metadata for job in figure_jobs if job.rendered],
+            "tables": [job.metadata for job in table_jobs]
+        }
+    
+    def _render_all_crops(self, document: fitz.Document, jobs: List[RenderJob],
+                          source_mtime: Optional[float] = None) -> None:
+        """Render planned crops grouped by page.
+        
+        Each page's crops go to ImageExtractor.extract_many_from_page, which
+        rasterizes a page with several crops only once. Sequential on purpose:
+        PyMuPDF documents must not be shared across threads, and rendering
+        holds the GIL.
+        
+        If source_mtime is given, crops whose file is at least that new are
+        kept and count as rendered.
+        """
+        if source_mtime is not None:
+            pending_jobs = []
+            for job in jobs:
+                if self._is_up_to_date(job.output_path, source_mtime):
+                    job.rendered = True
+                else:
+                    pending_jobs.append(job)
+            jobs = pending_jobs
+        
+        for page_number, page_jobs in groupby(sorted(jobs, key=attrgetter('page')),
+                                              key=attrgetter('page')):
+            page_jobs = list(page_jobs)
+            try:
+                page = document[page_number - 1]
+            except Exception:
+                continue
+            
+            rendered = ImageExtractor.extract_many_from_page(
+                page, [(job.bbox, job.output_path) for job in page_jobs],
+                self.dpi, PNG_COMPRESS_LEVEL
+            )
+            for job, job_rendered in zip(page_jobs, rendered):
+                job.rendered = job_rendered
+    
+    @staticmethod
+    def _source_mtime(pdf_path: str) -> Optional[float]:
+        """Modification time of the source PDF, or None if it cannot be read."""
+        try:
+            return os.path.getmtime(pdf_path)
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _is_up_to_date(output_path: str, source_mtime: float) -> bool:
+        """Check if output_path exists and is at least as new as the source PDF."""
+        try:
+            return os.path.getmtime(output_path) >= source_mtime
+        except OSError:
+            return False
     
     def _extract_text_elements(self, elements: List[Element]) -> List[Dict[str, Any]]:
-        """Extract text elements organized by blocks."""
-        from unstructured.documents.elements import (
-            Header, Footer, PageBreak, ListItem, NarrativeText
-        )
+        """Extract text elements organized by blocks.
         
+        Block content is collected as a list of paragraphs and the block bbox
+        as mutable [x0, y0, x1, y1] bounds; both are finalized once all
+        elements have been seen.
+        """
         text_blocks = []
         current_block = None
         block_counter = 0
         
         for idx, element in enumerate(elements):
-            if isinstance(element, (UnstructuredImage, Table, FigureCaption)):
+            element_class = type(element)
+            role = _TEXT_ROLE_BY_CLASS.get(element_class)
+            if role is None:
+                role = self._text_role_for_class(element_class)
+                _TEXT_ROLE_BY_CLASS[element_class] = role
+            
+            if role == _ROLE_SKIP:
                 continue
             
-            if isinstance(element, PageBreak):
-                if current_block and current_block["content"].strip():
+            if role == _ROLE_PAGE_BREAK:
+                if current_block and current_block["content"]:
                     text_blocks.append(current_block)
                 current_block = None
                 continue
             
-            if isinstance(element, (Header, Footer)):
-                continue
-            
-            page_num = self._get_element_page(element)
-            elem_type = self._classify_text_element(element)
             elem_text = str(element).strip()
-            
             if not elem_text:
                 continue
             
+            elem_type = self._classify_text_element(element, elem_text)
+            
             if elem_type in ["heading", "title"]:
-                if current_block and current_block["content"].strip():
+                if current_block and current_block["content"]:
                     text_blocks.append(current_block)
                 
                 block_counter += 1
                 current_block = {
                     "type": "section",
                     "block_index": block_counter,
-                    "page": page_num,
+                    "page": self._get_element_page(element),
                     "heading": elem_text,
-                    "heading_level": self._get_heading_level(element),
-                    "content": "",
+                    "heading_level": self._get_heading_level(element, elem_text),
+                    "content": [],
                     "elements": [],
-                    "bounding_box": BoundingBoxCalculator.extract_from_element(element)
+                    "bounding_box": self._mutable_bounds(element)
                 }
             elif current_block:
-                current_block["content"] += "\n\n" + elem_text if current_block["content"] else elem_text
+                current_block["content"].append(elem_text)
                 current_block["elements"].append({
                     "type": elem_type,
                     "text": elem_text,
                     "index": idx
                 })
                 
-                elem_bbox = BoundingBoxCalculator.extract_from_element(element)
-                if elem_bbox and current_block.get("bounding_box"):
-                    current_block["bounding_box"] = BoundingBoxCalculator.merge(
-                        current_block["bounding_box"], elem_bbox
-                    )
+                block_bounds = current_block["bounding_box"]
+                if block_bounds:
+                    elem_bounds = BoundingBoxOperations.raw_bounds(element)
+                    if elem_bounds:
+                        x0, y0, x1, y1 = elem_bounds
+                        block_bounds[0] = min(block_bounds[0], x0)
+                        block_bounds[1] = min(block_bounds[1], y0)
+                        block_bounds[2] = max(block_bounds[2], x1)
+                        block_bounds[3] = max(block_bounds[3], y1)
             else:
                 block_counter += 1
                 current_block = {
                     "type": "paragraph",
                     "block_index": block_counter,
-                    "page": page_num,
+                    "page": self._get_element_page(element),
                     "heading": None,
-                    "content": elem_text,
+                    "content": [elem_text],
                     "elements": [{
                         "type": elem_type,
                         "text": elem_text,
                         "index": idx
                     }],
-                    "bounding_box": BoundingBoxCalculator.extract_from_element(element)
+                    "bounding_box": self._mutable_bounds(element)
                 }
         
-        if current_block and current_block["content"].strip():
+        if current_block and current_block["content"]:
             text_blocks.append(current_block)
         
         for block in text_blocks:
-            if block.get("bounding_box"):
-                block["bounding_box"] = block["bounding_box"].to_dict()
+            block["content"] = "\n\n".join(block["content"])
+            if block["bounding_box"]:
+                block["bounding_box"] = BoundingBox(*block["bounding_box"]).to_dict()
         
         return text_blocks
     
+    @staticmethod
+    def _mutable_bounds(element: Element) -> Optional[List[float]]:
+        """Element bounds as an [x0, y0, x1, y1] list a text block can grow in place."""
+        bounds = BoundingBoxOperations.raw_bounds(element)
+        return list(bounds) if bounds else None
+    
+    @staticmethod
+    def _text_role_for_class(element_class: type) -> int:
+        """Resolve the _ROLE_* value for an element class with issubclass."""
+        if issubclass(element_class, _SKIPPED_TEXT_CLASSES):
+            return _ROLE_SKIP
+        if issubclass(element_class, PageBreak):
+            return _ROLE_PAGE_BREAK
+        return _ROLE_TEXT
+    
     def _get_element_page(self, element: Element) -> int:
         """Get page number for an element."""
-        if (hasattr(element, 'metadata') and 
-            hasattr(element.metadata, 'page_number') and
-            element.metadata.page_number):
-            return element.metadata.page_number
-        return 1
-    
-    def _classify_text_element(self, element: Element) -> str:
-        """Classify the type of text element."""
-        from unstructured.documents.elements import (
-            ListItem, Header, Footer
-        )
-        
-        if isinstance(element, Title):
-            return "title"
-        elif isinstance(element, Header):
-            return "header"
-        elif isinstance(element, Footer):
-            return "footer"
-        elif isinstance(element, ListItem):
-            return "list_item"
-        elif isinstance(element, NarrativeText):
-            return "paragraph"
-        elif isinstance(element, Text):
-            text = str(element).strip()
-            if self._is_heading_text(text):
-                return "heading"
-            return "text"
-        else:
-            return "unknown"
+        try:
+            return _PAGE_GETTER(element) or 1
+        except AttributeError:
+            return 1
+    
+    def _classify_text_element(self, element: Element, text: Optional[str] = None) -> str:
+        """Classify the type of text element.
+        
+        Args:
+            element: Element to classify
+            text: str(element).strip(), if the caller already computed it
+        """
+        element_class = type(element)
+        label = _TEXT_TYPE_BY_CLASS.get(element_class)
+        if label is None:
+            label = self._label_for_class(element_class)
+            _TEXT_TYPE_BY_CLASS[element_class] = label
+        
+        if label == _HEADING_CANDIDATE:
+            if text is None:
+                text = str(element).strip()
+            return "heading" if self._is_heading_text(text) else "text"
+        return label
+    
+    @staticmethod
+    def _label_for_class(element_class: type) -> str:
+        """Resolve the label for an element class with the isinstance cascade."""
+        for label_class, label in TEXT_TYPE_LABELS:
+            if issubclass(element_class, label_class):
+                return label
+        if issubclass(element_class, Text):
+            return _HEADING_CANDIDATE
+        return "unknown"
     
     def _is_heading_text(self, text: str) -> bool:
         """Check if text appears to be a heading."""
         if len(text) > 100:
             return False
         
-        heading_patterns = [
-            r'^第\s*\d+\s*章',
-            r'^Chapter\s+\d+',
-            r'^Section\s+\d+',
-            r'^\d+\.\s+[A-Z]',
-            r'^[A-Z][^.!?]*$'
-        ]
-        
-        import re
-        for pattern in heading_patterns:
-            if re.match(pattern, text):
-                return True
-        
-        return False
+        return any(pattern.match(text) for pattern in HEADING_PATTERNS)
     
-    def _get_heading_level(self, element: Element) -> int:
-        """Determine the heading level."""
-        text = str(element).strip()
+    def _get_heading_level(self, element: Element, text: Optional[str] = None) -> int:
+        """Determine the heading level.
+        
+        Args:
+            element: Heading element
+            text: str(element).strip(), if the caller already computed it
+        """
+        if text is None:
+            text = str(element).strip()
         
-        import re
-        if re.match(r'^第\s*\d+\s*章|^Chapter\s+\d+', text):
+        if HEADING_LEVEL_1_PATTERN.match(text):
             return 1
-        elif re.match(r'^\d+\.\s+', text):
+        elif HEADING_LEVEL_2_PATTERN.match(text):
             return 2
         elif isinstance(element, Title):
             if hasattr(element, 'metadata') and hasattr(element.metadata, 'category_depth'):
@@ -285,14 +465,12 @@ class PDFElementExtractor:
             return 3
     
     def _resolve_merge(self, elem_info: ElementInfo,
-                      preprocessed: List[ElementInfo],
+                      index_map: Dict[int, ElementInfo],
                       merged_indices: set) -> Tuple[Element, Optional[BoundingBox]]:
         if elem_info.merge_with is None:
             return elem_info.element, elem_info.bbox
         
-        merge_elem_info = next(
-            (e for e in preprocessed if e.index == elem_info.merge_with), None
-        )
+        merge_elem_info = index_map.get(elem_info.merge_with)
         
         if merge_elem_info:
             merged_indices.update([elem_info.index, elem_info.merge_with])
@@ -303,27 +481,20 @@ class PDFElementExtractor:
         
         return elem_info.element, elem_info.bbox
     
-    def _process_figure(self, element: Element, bbox: Optional[BoundingBox],
-                       page: int, counter: int, pdf_name: str, pdf_path: str,
-                       original_elements: List[Element], 
-                       element_index: int) -> Optional[Dict[str, Any]]:
+    def _plan_figure(self, element: Element, bbox: Optional[BoundingBox],
+                     page: int, counter: int, pdf_name: str,
+                     captions: CaptionIndex,
+                     element_index: int) -> Optional[RenderJob]:
         if not self._is_valid_figure_size(bbox):
             return None
         
-        caption_info = CaptionExtractor.find_for_element(
-            original_elements, element_index, page
-        )
+        caption_info = captions.find_for_element(element_index, page)
         
         final_bbox = self._merge_with_caption_bbox(bbox, caption_info.bbox)
         filename = f"fig{counter}.png"
-        filepath = os.path.join(self.figures_dir, filename)
-        
-        if not ImageExtractor.extract_from_pdf(
-            pdf_path, final_bbox, page, filepath, self.dpi
-        ):
-            return None
+        filepath = self._figures_prefix + filename
         
-        return {
+        return RenderJob(page=page, bbox=final_bbox, output_path=filepath, metadata={
             "filename": filename,
             "source_pdf": pdf_name,
             "page_number": page,
@@ -334,35 +505,31 @@ class PDFElementExtractor:
             "original_type": type(element).__name__,
             "reclassified": type(element).__name__ == 'Table',
             "element_id": getattr(element, 'id', None)
-        }
+        })
     
-    def _process_table(self, element: Element, bbox: Optional[BoundingBox],
-                      page: int, counter: int, pdf_name: str, pdf_path: str,
-                      original_elements: List[Element],
-                      element_index: int) -> Optional[Dict[str, Any]]:
-        caption_info = CaptionExtractor.find_for_element(
-            original_elements, element_index, page
-        )
+    def _plan_table(self, element: Element, bbox: Optional[BoundingBox],
+                    page: int, counter: int, pdf_name: str,
+                    captions: CaptionIndex,
+                    element_index: int) -> RenderJob:
+        """Plan a table crop; the CSV needs no rendering and is written right away.
+        
+        Tables without a bounding box get a job with bbox None, which is
+        never rendered.
+        """
+        caption_info = captions.find_for_element(element_index, page)
         
         saved_files = []
         
         if isinstance(element, Table):
             csv_filename = f"table{counter}.csv"
-            csv_path = os.path.join(self.tables_dir, csv_filename)
+            csv_path = self._tables_prefix + csv_filename
             if TableDataExporter.save_as_csv(element, csv_path):
                 saved_files.append(csv_filename)
         
-        if bbox:
-            final_bbox = self._merge_with_caption_bbox(bbox, caption_info.bbox)
-            img_filename = f"table{counter}.png"
-            img_filepath = os.path.join(self.tables_dir, img_filename)
-            
-            if ImageExtractor.extract_from_pdf(
-                pdf_path, final_bbox, page, img_filepath, self.dpi
-            ):
-                saved_files.append(img_filename)
+        final_bbox = self._merge_with_caption_bbox(bbox, caption_info.bbox) if bbox else None
+        img_filepath = f"{self._tables_prefix}table{counter}.png"
         
-        return {
+        return RenderJob(page=page, bbox=final_bbox, output_path=img_filepath, metadata={
             "files": saved_files,
             "source_pdf": pdf_name,
             "page_number": page,
@@ -374,7 +541,7 @@ class PDFElementExtractor:
             "original_type": type(element).__name__,
             "reclassified": type(element).__name__ == 'Image',
             "element_id": getattr(element, 'id', None)
-        }
+        })
     
     def _is_valid_figure_size(self, bbox: Optional[BoundingBox]) -> bool:
         if not bbox:
@@ -405,8 +572,7 @@ class MetadataManager:
             return
         
         figures_json = os.path.join(output_dir, "figures", "metadata.json")
-        with open(figures_json, 'w', encoding='utf-8') as f:
-            json.dump(figures, f, indent=2, ensure_ascii=False)
+        json_utils.dump_to_file(figures, figures_json, indent=True)
     
     @staticmethod
     def _save_tables_metadata(tables: List[Dict[str, Any]], output_dir: str) -> None:
@@ -414,8 +580,7 @@ class MetadataManager:
             return
         
         tables_json = os.path.join(output_dir, "tables", "metadata.json")
-        with open(tables_json, 'w', encoding='utf-8') as f:
-            json.dump(tables, f, indent=2, ensure_ascii=False)
+        json_utils.dump_to_file(tables, tables_json, indent=True)
     
     @staticmethod
     def _save_combined_metadata(metadata: Dict[str, List[Dict[str, Any]]], output_dir: str) -> None:
@@ -423,8 +588,7 @@ class MetadataManager:
         combined_metadata = MetadataManager._build_combined_metadata(metadata)
         
         metadata_json = os.path.join(output_dir, "metadata.json")
-        with open(metadata_json, 'w', encoding='utf-8') as f:
-            json.dump(combined_metadata, f, indent=2, ensure_ascii=False)
+        json_utils.dump_to_file(combined_metadata, metadata_json, indent=True)
     
     @staticmethod
     def _build_combined_metadata(metadata: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
@@ -474,25 +638,34 @@ class MetadataManager:
                 "original_type": table.get("original_type")
             }
             
-            if any(f.endswith('.png') for f in table.get("files", [])):
-                png_file = next(f for f in table["files"] if f.endswith('.png'))
+            # First PNG and first CSV, in a single pass over the files
+            png_file = csv_file = None
+            for f in table.get("files", ()):
+                if f.endswith('.png'):
+                    png_file = png_file or f
+                elif f.endswith('.csv'):
+                    csv_file = csv_file or f
+            
+            if png_file:
                 element["image_path"] = f"tables/{png_file}"
                 element["markdown_reference"] = f"![{table.get('caption', 'Table ' + str(table['table_index']))}](tables/{png_file})"
             
-            if any(f.endswith('.csv') for f in table.get("files", [])):
-                csv_file = next(f for f in table["files"] if f.endswith('.csv'))
+            if csv_file:
                 element["data_path"] = f"tables/{csv_file}"
             
             all_elements.append(element)
         
-        all_elements.sort(key=lambda x: (x["page"], x.get("bounding_box", {}).get("y0", 0)))
+        # Elements without a bounding box carry None, so default before descending
+        all_elements.sort(key=lambda x: (x["page"], (x.get("bounding_box") or {}).get("y0", 0)))
         
-        pages_structure = {}
-        for element in all_elements:
-            page = element["page"]
-            if page not in pages_structure:
-                pages_structure[page] = []
-            pages_structure[page].append(element)
+        # Sorted by page, so each page forms exactly one group. Pages list
+        # positions into "elements" rather than repeating the element dicts;
+        # consumers rehydrate them with elements[position].
+        pages_structure = {
+            page: [position for position, _ in page_positions]
+            for page, page_positions in groupby(enumerate(all_elements),
+                                                key=lambda entry: entry[1]["page"])
+        }
         
         return {
             "extraction_info": {
@@ -504,75 +677,73 @@ class MetadataManager:
             },
             "elements": all_elements,
             "pages_structure": pages_structure,
-            "markdown_structure": MetadataManager._generate_markdown_structure(all_elements)
+            "markdown_structure": list(MetadataManager._iter_markdown_structure(all_elements))
         }
     
     @staticmethod
-    def _generate_markdown_structure(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate markdown document structure."""
-        structure = []
+    def _iter_markdown_structure(elements: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the markdown document structure entries, one per page header or element."""
         current_page = None
         
         for element in elements:
             if element["page"] != current_page:
                 current_page = element["page"]
-                structure.append({
+                yield {
                     "type": "page_header",
                     "page": current_page,
                     "markdown": f"## Page {current_page}"
-                })
+                }
             
             if element["type"] == "text_block":
                 if element["block_type"] == "section":
                     heading_level = element.get("heading_level") or 2
                     heading_prefix = "#" * (heading_level + 1)
-                    structure.append({
+                    yield {
                         "type": "section",
                         "page": element["page"],
                         "index": element["index"],
                         "heading": element.get("heading"),
                         "markdown": f"{heading_prefix} {element.get('heading', '')}\n\n{element['content']}"
-                    })
+                    }
                 else:
-                    structure.append({
+                    yield {
                         "type": "paragraph",
                         "page": element["page"],
                         "index": element["index"],
                         "markdown": element["content"]
-                    })
+                    }
             elif element["type"] == "figure":
-                structure.append({
+                yield {
                     "type": "figure",
                     "page": element["page"],
                     "index": element["index"],
                     "caption": element.get("caption"),
-                    "markdown": f"### 🖼️ Figure: {element.get('caption', 'Figure ' + str(element['index']))}\n\n{element['markdown_reference']}"
-                })
+                    "markdown": f"{_FIGURE_HEADING_PREFIX}{element.get('caption', 'Figure ' + str(element['index']))}\n\n{element['markdown_reference']}"
+                }
             elif element["type"] == "table":
                 caption = element.get("caption", f"Table {element['index']}")
-                markdown = f"### 📋 Table: {caption}"
+                markdown = f"{_TABLE_HEADING_PREFIX}{caption}"
                 
                 if "markdown_reference" in element:
                     markdown += f"\n\n{element['markdown_reference']}"
                 
                 if "data_path" in element:
-                    markdown += f"\n\n[📊 Download CSV]({element['data_path']})"
+                    markdown += f"\n\n{_CSV_LINK_PREFIX}({element['data_path']})"
                 
-                structure.append({
+                yield {
                     "type": "table",
                     "page": element["page"],
                     "index": element["index"],
                     "caption": caption,
                     "markdown": markdown
-                })
-        
-        return structure
+                }
 
 
 def extract_all_elements(pdf_path: str, output_dir: str = "extracted_elements",
                         strategy: str = "hi_res", 
-                        dpi: int = DEFAULT_DPI) -> Dict[str, List[Dict[str, Any]]]:
-    extractor = PDFElementExtractor(output_dir, dpi)
+                        dpi: int = DEFAULT_DPI,
+                        skip_existing: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    extractor = PDFElementExtractor(output_dir, dpi, skip_existing=skip_existing)
     return extractor.extract(pdf_path, strategy)
 
 
@@ -580,6 +751,52 @@ def save_metadata(metadata: Dict[str, List[Dict[str, Any]]], output_dir: str) ->
     MetadataManager.save(metadata, output_dir)
 
 
+def _extract_and_save(pdf_path: str, output_dir: str, strategy: str,
+                      dpi: int, skip_existing: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """Extract one PDF and save its metadata (runs in a batch_extract worker)."""
+    metadata = extract_all_elements(pdf_path, output_dir, strategy, dpi, skip_existing)
+    save_metadata(metadata, output_dir)
+    return metadata
+
+
+def batch_extract(pdf_paths: List[str], output_dir: str = "extracted_elements",
+                  strategy: str = "hi_res", dpi: int = DEFAULT_DPI,
+                  workers: Optional[int] = None,
+                  skip_existing: bool = False) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """Extract several PDFs in parallel, one worker process per PDF.
+    
+    Each PDF is written to output_dir/<pdf stem>. Workers are spawned rather
+    than forked so the layout models are never inherited across a fork.
+    
+    Returns:
+        Metadata per PDF path; PDFs that failed are reported and left out
+    """
+    workers = workers or min(os.cpu_count() or 1, 8)
+    results = {}
+    failures = []
+    
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(_extract_and_save, pdf_path,
+                            os.path.join(output_dir, Path(pdf_path).stem), strategy, dpi,
+                            skip_existing): pdf_path
+            for pdf_path in pdf_paths
+        }
+        
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Extracting PDFs"):
+            pdf_path = futures[future]
+            try:
+                results[pdf_path] = future.result()
+            except Exception as e:
+                failures.append((pdf_path, e))
+    
+    for pdf_path, error in failures:
+        print(f"Failed to extract {pdf_path}: {error}")
+    
+    return results
+
+
 def main() -> None:
     import sys
     
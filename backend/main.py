@@ -6,35 +6,71 @@ Wraps existing functionality without changing logic
 
 import os
 import sys
-import json
+import time
 import uuid
 import asyncio
+import shutil
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, List, Tuple
 from datetime import datetime
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, BackgroundTasks, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 # Add current directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
 # Import our existing modules - NO LOGIC CHANGES
-from extractors.parallel_pdf_extractor import ParallelPDFExtractor
+from extractors.parallel_pdf_extractor import extract_pdf
 from rag.index_to_chromadb import PDFMetadataIndexer
-from rag.rag_query import RAGQuerySystem
+from rag.rag_query import RAGQuerySystem, LLM_ERROR_PREFIX
+from response_cache import ResponseCache, SemanticCache
+from session_store import SessionStore
+from utils import json_utils
 
 # Load environment variables
 load_dotenv()
 
+# Uploads extracted concurrently; each extraction fans its pages out to
+# its own worker processes as well
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", "2"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the process pool that runs PDF extractions off the event loop."""
+    # Spawned rather than forked, since the server process runs threads
+    app.state.extraction_pool = ProcessPoolExecutor(
+        max_workers=EXTRACTION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        yield
+    finally:
+        app.state.extraction_pool.shutdown(cancel_futures=True)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="PDF RAG Chat API",
     description="API for PDF extraction, indexing, and chat",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend
@@ -46,14 +82,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip responses except PDFs, which are already compressed and served
+    with byte ranges that must stay uncompressed."""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/pdf/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress JSON bodies such as chat references; small responses aren't worth it
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024)
+
 # Storage paths
 UPLOAD_DIR = Path("uploads")
 EXTRACTION_DIR = Path("extractions")
 UPLOAD_DIR.mkdir(exist_ok=True)
 EXTRACTION_DIR.mkdir(exist_ok=True)
 
-# Store active sessions
-sessions: Dict[str, Dict[str, Any]] = {}
+# Chunk size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Messages kept per conversation; older ones drop off automatically
+MAX_HISTORY_MESSAGES = 20
+
+# Token budget for the conversation history sent with each question
+HISTORY_TOKEN_BUDGET = 2000
+
+# Seconds between websocket heartbeats while an answer is being generated
+HEARTBEAT_INTERVAL_SECONDS = 2.0
+
+# Sessions persist in SQLite so they survive restarts and are shared by workers
+sessions = SessionStore(os.environ.get("SESSIONS_DB", "sessions.db"))
+
+# Conversation history of /chat per document, kept in process memory
+conversation_histories: Dict[str, deque] = {}
+
+# One RAG system per document, so its ChromaDB collection and LLM clients
+# are opened once per process instead of on every message
+rag_systems: Dict[str, RAGQuerySystem] = {}
+rag_system_locks: Dict[str, asyncio.Lock] = {}
+
+# Answers to stateless (history-free) questions, shared by /chat and /ws
+response_cache = ResponseCache()
+
+# Answers to close paraphrases of earlier stateless questions
+semantic_cache = SemanticCache()
+
+# Stateless /chat questions being answered right now, keyed like the response
+# cache, so identical concurrent requests share one RAG query
+inflight_answers: Dict[Tuple[str, int, str], asyncio.Task] = {}
 
 
 # Pydantic models for request/response
@@ -84,11 +165,139 @@ class DocumentInfo(BaseModel):
     pages: List[int]
 
 
-class UploadResponse(BaseModel):
-    document_id: str
-    filename: str
-    chunks_processed: int
-    message: str
+# Queues of this worker's websockets waiting for a document to finish processing
+status_listeners: Dict[str, List[asyncio.Queue]] = {}
+
+FINAL_STATUSES = ("completed", "failed")
+
+# Seconds between status re-reads while a websocket waits on a document that
+# may be processed by another worker
+STATUS_POLL_INTERVAL_SECONDS = 1.0
+
+
+def set_status(document_id: str, status: str, progress: int, message: str) -> ProcessingStatus:
+    """Record the processing stage of a document and notify waiting websockets.
+    
+    The status is stored with the sessions so that every worker can report
+    it; websockets on this worker are notified right away.
+    """
+    current = ProcessingStatus(
+        status=status,
+        progress=progress,
+        message=message,
+        document_id=document_id
+    )
+    sessions.set_status(document_id, current.model_dump())
+    
+    for queue in status_listeners.get(document_id, []):
+        queue.put_nowait(current)
+    return current
+
+
+def get_status(document_id: str) -> Optional[ProcessingStatus]:
+    """Processing status of a document, or None if it is unknown."""
+    status = sessions.get_status(document_id)
+    return ProcessingStatus(**status) if status is not None else None
+
+
+async def send_ws_json(websocket: WebSocket, payload: Dict[str, Any]) -> None:
+    """Send payload as a JSON text frame, serialized with orjson when available."""
+    await websocket.send_text(json_utils.dumps(payload).decode('utf-8'))
+
+
+async def receive_ws_json(websocket: WebSocket) -> Any:
+    """Receive a JSON text frame from the client."""
+    return json_utils.loads(await websocket.receive_text())
+
+
+async def send_heartbeats(websocket: WebSocket, interval: float = HEARTBEAT_INTERVAL_SECONDS) -> None:
+    """Send heartbeat messages until cancelled, while a query is running."""
+    while True:
+        await asyncio.sleep(interval)
+        await send_ws_json(websocket, {"type": "heartbeat"})
+
+
+async def stream_processing_status(websocket: WebSocket, document_id: str) -> bool:
+    """Send status messages until a document finishes processing.
+    
+    Returns True if the document is ready for chat, False if it is unknown
+    or failed (an error message has been sent).
+    """
+    status = get_status(document_id)
+    if status is None:
+        await send_ws_json(websocket, {
+            "type": "error",
+            "message": "Document not found"
+        })
+        return False
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    status_listeners.setdefault(document_id, []).append(queue)
+    sent_status = None
+    try:
+        while status.status not in FINAL_STATUSES:
+            if status != sent_status:
+                await send_ws_json(websocket, {"type": "status", **status.model_dump()})
+                sent_status = status
+            
+            try:
+                status = await asyncio.wait_for(queue.get(), STATUS_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                # The document may be processed by another worker
+                status = get_status(document_id) or status
+    finally:
+        status_listeners[document_id].remove(queue)
+        if not status_listeners[document_id]:
+            del status_listeners[document_id]
+    
+    await send_ws_json(websocket, {"type": "status", **status.model_dump()})
+    
+    if status.status == "failed":
+        await send_ws_json(websocket, {
+            "type": "error",
+            "message": status.message
+        })
+        return False
+    
+    return True
+
+
+def uuid7_str() -> str:
+    """Time-ordered UUID (version 7): 48-bit millisecond timestamp, then random bits.
+    
+    Documents uploaded in sequence get IDs (and doc_ collection names) that
+    sort chronologically, keeping them close together in B-tree indexes.
+    """
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)   # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)   # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
+def save_upload(source, destination: Path) -> None:
+    """Copy an uploaded file object to disk in UPLOAD_CHUNK_SIZE chunks."""
+    with open(destination, "wb") as f:
+        shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
+
+
+def index_document(document_id: str, extraction_dir: Path) -> Dict[str, Any]:
+    """Index a document's extracted metadata into its own ChromaDB collection."""
+    indexer = PDFMetadataIndexer(
+        collection_name=f"doc_{document_id}",
+        use_openai=True,
+        azure=True
+    )
+    
+    # Clear any existing data for this document
+    indexer.clear_collection()
+    
+    # Index the extracted content
+    metadata_path = extraction_dir / "metadata.json"
+    return indexer.index_from_metadata(
+        str(metadata_path),
+        base_dir=str(extraction_dir)
+    )
 
 
 @app.get("/")
@@ -97,60 +306,59 @@ async def root():
     return {"message": "PDF RAG Chat API is running"}
 
 
-@app.post("/upload-pdf", response_model=UploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+@app.post("/upload-pdf", response_model=ProcessingStatus, status_code=202)
+async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
-    Upload and process a PDF file.
-    Uses existing extraction logic without changes.
+    Upload a PDF file and queue it for processing.
+    Returns immediately; progress is available from /status/{document_id}
+    and is streamed over /ws/{document_id}.
     """
     # Validate file type
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     # Generate unique document ID
-    document_id = str(uuid.uuid4())
+    document_id = uuid7_str()
     
-    # Save uploaded file
+    # Save uploaded file, streamed in chunks on a worker thread so large PDFs
+    # are never held in memory and the event loop keeps serving other requests
     upload_path = UPLOAD_DIR / f"{document_id}.pdf"
-    with open(upload_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    await asyncio.to_thread(save_upload, file.file, upload_path)
     
     # Create extraction directory
     extraction_dir = EXTRACTION_DIR / document_id
     extraction_dir.mkdir(exist_ok=True)
     
+    status = set_status(document_id, "queued", 0, "Queued for processing")
+    background_tasks.add_task(process_pdf, document_id, file.filename, upload_path, extraction_dir)
+    
+    return status
+
+
+async def process_pdf(document_id: str, filename: str, upload_path: Path,
+                      extraction_dir: Path) -> None:
+    """
+    Extract and index an uploaded PDF (runs as a background task).
+    Uses existing extraction logic without changes.
+    """
     try:
-        # Step 1: Extract PDF using existing logic
-        extractor = ParallelPDFExtractor(
-            pdf_path=str(upload_path),
-            output_directory=str(extraction_dir),
-            max_workers=4
-        )
-        
-        extraction_summary = extractor.extract()
-        
-        # Step 2: Index to ChromaDB using existing logic
-        indexer = PDFMetadataIndexer(
-            collection_name=f"doc_{document_id}",
-            use_openai=True,
-            azure=True
+        # Step 1: Extract PDF using existing logic, in the extraction process pool
+        set_status(document_id, "extracting", 10, "Extracting PDF content")
+        loop = asyncio.get_running_loop()
+        extraction_summary = await loop.run_in_executor(
+            app.state.extraction_pool, extract_pdf,
+            str(upload_path), str(extraction_dir), 4
         )
         
-        # Clear any existing data for this document
-        indexer.clear_collection()
-        
-        # Index the extracted content
-        metadata_path = extraction_dir / "metadata.json"
-        indexing_stats = indexer.index_from_metadata(
-            str(metadata_path),
-            base_dir=str(extraction_dir)
-        )
+        # Step 2: Index to ChromaDB using existing logic; mostly embedding API
+        # calls, so a thread is enough
+        set_status(document_id, "indexing", 60, "Indexing extracted content")
+        indexing_stats = await asyncio.to_thread(index_document, document_id, extraction_dir)
         
         # Store session info
-        sessions[document_id] = {
+        session = {
             "document_id": document_id,
-            "filename": file.filename,
+            "filename": filename,
             "upload_path": str(upload_path),
             "extraction_dir": str(extraction_dir),
             "collection_name": f"doc_{document_id}",
@@ -159,15 +367,37 @@ async def upload_pdf(file: UploadFile = File(...)):
             "created_at": datetime.now().isoformat()
         }
         
-        return UploadResponse(
-            document_id=document_id,
-            filename=file.filename,
-            chunks_processed=indexing_stats.get("total_documents", 0),
-            message="PDF processed and indexed successfully"
-        )
+        # Document info only changes on re-indexing, so it is built once here
+        info = await asyncio.to_thread(build_document_info, document_id, session)
+        session["info"] = info.model_dump()
+        
+        sessions[document_id] = session
         
+        chunks_processed = indexing_stats.get("total_documents", 0)
+        set_status(document_id, "completed", 100,
+                   f"PDF processed and indexed successfully ({chunks_processed} chunks)")
+        
+    except Exception as e:
+        set_status(document_id, "failed", 100, f"Processing failed: {str(e)}")
+        return
+    
+    # Open the RAG system now so the first chat message doesn't pay for it;
+    # the document is already usable, so a failure here only defers that to
+    # the first chat, which creates the system itself
+    try:
+        await get_rag_system(document_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+        print(f"Warning: could not prepare chat for document {document_id}: {e}")
+
+
+@app.get("/status/{document_id}", response_model=ProcessingStatus)
+async def get_processing_status(document_id: str):
+    """Get the processing progress of an uploaded document."""
+    status = get_status(document_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return status
 
 
 @app.get("/document/{document_id}/info", response_model=DocumentInfo)
@@ -176,26 +406,260 @@ async def get_document_info(document_id: str):
     if document_id not in sessions:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    # Built once after indexing; sessions from before that are filled in here
     session = sessions[document_id]
+    info = session.get("info")
+    if info is None:
+        info = build_document_info(document_id, session).model_dump()
+        session["info"] = info
+        sessions[document_id] = session
+    
+    return info
+
+
+def create_rag_system(session: Dict[str, Any]) -> RAGQuerySystem:
+    """Open the RAG system for a session's collection using existing logic."""
+    return RAGQuerySystem(
+        db_path="./chroma_db",
+        collection_name=session["collection_name"],
+        output_dir=session["extraction_dir"],
+        use_azure=True
+    )
+
+
+async def get_rag_system(document_id: str) -> RAGQuerySystem:
+    """Return the cached RAG system of a document, creating it on first use."""
+    rag = rag_systems.get(document_id)
+    if rag is not None:
+        return rag
+    
+    # Concurrent first requests wait for a single initialization
+    async with rag_system_locks.setdefault(document_id, asyncio.Lock()):
+        rag = rag_systems.get(document_id)
+        if rag is None:
+            rag = await asyncio.to_thread(create_rag_system, sessions[document_id])
+            rag_systems[document_id] = rag
+    return rag
+
+
+def close_rag_system(document_id: str) -> None:
+    """Drop the cached RAG system of a document."""
+    rag_system_locks.pop(document_id, None)
+    rag = rag_systems.pop(document_id, None)
+    close = getattr(rag, "close", None)
+    if close is not None:
+        close()
+
+
+@lru_cache(maxsize=1)
+def history_encoding():
+    """Tokenizer used to measure history, or None when tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Warning: tiktoken encoding unavailable, estimating history tokens: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text; about four characters per token without tiktoken."""
+    encoding = history_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def trim_history(history: deque, max_tokens: int = HISTORY_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """Most recent messages of a conversation that fit in max_tokens, oldest first."""
+    kept = []
+    used = 0
+    for message in reversed(history):
+        used += count_tokens(message["content"])
+        if used > max_tokens:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
+def lookup_cached_answer(rag: RAGQuerySystem, document_id: str, question: str, n_results: int,
+                         history: List[Dict[str, str]]) -> Tuple[Optional[Tuple[str, List[Dict[str, Any]]]], Optional[List[float]]]:
+    """Return (cached answer or None, question embedding or None).
+    
+    Only stateless turns are cached, since history changes the answer. An
+    exact repeat is looked up first, then a paraphrase by question embedding.
+    The embedding goes through the embedding cache, so the query that follows
+    a miss reuses it.
+    """
+    if history:
+        return None, None
+    
+    cached = response_cache.get(document_id, question, n_results)
+    if cached:
+        return cached, None
+    
+    embedding = rag.embed_query(question)
+    return semantic_cache.get(document_id, embedding, n_results), embedding
+
+
+def store_answer(document_id: str, question: str, n_results: int, embedding: Optional[List[float]],
+                 answer: str, references: List[Dict[str, Any]]) -> None:
+    """Cache the answer to a stateless question (embedding is None for other turns)."""
+    if embedding is None or answer.startswith(LLM_ERROR_PREFIX):
+        return
+    response_cache.set(document_id, question, n_results, answer, references)
+    semantic_cache.set(document_id, embedding, n_results, answer, references)
+
+
+def answer_question(rag: RAGQuerySystem, document_id: str, question: str,
+                    n_results: int, history: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Answer a question using existing RAG query logic, reusing cached answers.
+    
+    Blocking (embedding and LLM calls), so callers run it on a worker thread.
+    """
+    cached, embedding = lookup_cached_answer(rag, document_id, question, n_results, history)
+    if cached:
+        return cached
+    
+    # Query using existing logic - returns (answer, references)
+    answer, references = rag.query(
+        question,
+        n_results=n_results,
+        verbose=False,
+        conversation_history=history,
+        return_references=True
+    )
+    
+    store_answer(document_id, question, n_results, embedding, answer, references)
+    return answer, references
+
+
+async def coalesce(key: Tuple[str, int, str], make_coroutine: Callable[[], Awaitable[Any]]) -> Any:
+    """Await the in-flight task for key, starting one from make_coroutine if there is none."""
+    task = inflight_answers.get(key)
+    if task is None:
+        task = asyncio.ensure_future(make_coroutine())
+        inflight_answers[key] = task
+        task.add_done_callback(lambda _: inflight_answers.pop(key, None))
+    
+    # Shielded so one caller going away doesn't cancel the others
+    return await asyncio.shield(task)
+
+
+async def iterate_in_thread(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Consume a blocking iterator on a worker thread, yielding its items here.
+    
+    Exceptions raised by the iterator are re-raised in the caller. If the
+    caller stops early (disconnect, cancellation or closing this generator),
+    the thread stops at the next item and closes the iterator, so an LLM
+    stream is not read to the end for nobody.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    stopped = threading.Event()
+    
+    def drain() -> None:
+        try:
+            for item in iterator:
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+    
+    worker = loop.run_in_executor(None, drain)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is finished:
+                break
+            yield item
+    finally:
+        stopped.set()
+    
+    await worker
+    if error is not None:
+        raise error
+
+
+async def stream_answer(websocket: WebSocket, rag: RAGQuerySystem, document_id: str,
+                        question: str, n_results: int,
+                        history: List[Dict[str, str]],
+                        on_start: Optional[Callable[[], Any]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """Send an answer over the websocket token by token and return it.
+    
+    Sends {"type": "token", "delta": ...} frames followed by one
+    {"type": "done", "message": ..., "references": ...} frame. Cached answers
+    are sent as a single token. on_start is called before the first token
+    frame is sent.
+    """
+    cached, embedding = await asyncio.to_thread(
+        lookup_cached_answer, rag, document_id, question, n_results, history
+    )
+    
+    if cached:
+        answer, references = cached
+        if on_start is not None:
+            on_start()
+        await send_ws_json(websocket, {"type": "token", "delta": answer})
+    else:
+        tokens = []
+        references = []
+        stream = iterate_in_thread(
+            rag.query_stream(question, n_results=n_results, conversation_history=history)
+        )
+        async with aclosing(stream):
+            async for token, final_references in stream:
+                if final_references is not None:
+                    references = final_references
+                elif token:
+                    if not tokens and on_start is not None:
+                        on_start()
+                    tokens.append(token)
+                    await send_ws_json(websocket, {"type": "token", "delta": token})
+        
+        answer = "".join(tokens)
+        store_answer(document_id, question, n_results, embedding, answer, references)
+    
+    await send_ws_json(websocket, {
+        "type": "done",
+        "message": answer,
+        "references": references
+    })
+    return answer, references
+
+
+def build_document_info(document_id: str, session: Dict[str, Any]) -> DocumentInfo:
+    """Summarize a processed document for /document/{document_id}/info.
+    
+    Reads metadata.json, so it runs once per document and the result is
+    stored in the session.
+    """
     summary = session.get("extraction_summary", {})
     indexing_stats = session.get("indexing_stats", {})
     
-    # Calculate total text length from metadata
+    # Total text length and unique page numbers in a single pass over sections
     metadata_path = Path(session["extraction_dir"]) / "metadata.json"
     total_text_length = 0
-    pages_list = []
+    pages_set = set()
     
     if metadata_path.exists():
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-            for section in metadata.get("sections", []):
-                total_text_length += len(section.get("text", ""))
-            # Get unique page numbers
-            pages_set = set()
-            for section in metadata.get("sections", []):
-                if "page_number" in section:
-                    pages_set.add(section["page_number"])
-            pages_list = sorted(list(pages_set))
+        metadata = json_utils.load_from_file(metadata_path)
+        for section in metadata.get("sections", []):
+            total_text_length += len(section.get("text", ""))
+            if "page_number" in section:
+                pages_set.add(section["page_number"])
+    
+    pages_list = sorted(pages_set)
     
     # If no pages found, create a list based on total_pages
     if not pages_list and summary.get("total_pages", 0) > 0:
@@ -217,14 +681,24 @@ async def get_pdf(document_id: str):
     if document_id not in sessions:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    pdf_path = sessions[document_id]["upload_path"]
-    if not Path(pdf_path).exists():
+    session = sessions[document_id]
+    pdf_path = session["upload_path"]
+    try:
+        pdf_stat = os.stat(pdf_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="PDF file not found")
     
+    # With the stat result Starlette sets Content-Length, Last-Modified and
+    # ETag and answers Range requests, so the viewer can fetch only the
+    # byte ranges of the pages it shows
     return FileResponse(
         pdf_path,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"inline; filename={sessions[document_id]['filename']}"}
+        stat_result=pdf_stat,
+        headers={
+            "Cache-Control": "public, max-age=3600",
+            "Content-Disposition": f"inline; filename={session['filename']}"
+        }
     )
 
 
@@ -237,46 +711,42 @@ async def chat(message: ChatMessage):
     if message.document_id not in sessions:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    session = sessions[message.document_id]
-    collection_name = session["collection_name"]
-    extraction_dir = session["extraction_dir"]
-    
     try:
-        # Initialize RAG system using existing logic
-        rag = RAGQuerySystem(
-            db_path="./chroma_db",
-            collection_name=collection_name,
-            output_dir=extraction_dir,
-            use_azure=True
+        # Get conversation history if it exists
+        conversation_history = conversation_histories.setdefault(
+            message.document_id, deque(maxlen=MAX_HISTORY_MESSAGES)
         )
         
-        # Get conversation history if it exists
-        if "conversation_history" not in session:
-            session["conversation_history"] = []
+        rag = await get_rag_system(message.document_id)
         
-        # Query using existing logic - returns (answer, references)
-        answer, references = rag.query(
-            message.message,
-            n_results=message.n_results,
-            verbose=False,
-            conversation_history=session["conversation_history"],
-            return_references=True
-        )
+        # The LLM round-trip runs on a worker thread to keep the event loop free
+        history = trim_history(conversation_history)
+        
+        def run_query() -> Awaitable[Tuple[str, List[Dict[str, Any]]]]:
+            return asyncio.to_thread(
+                answer_question, rag, message.document_id, message.message,
+                message.n_results, history
+            )
+        
+        if history:
+            answer, references = await run_query()
+        else:
+            # Identical stateless questions asked at the same time share one answer
+            answer, references = await coalesce(
+                ResponseCache.key(message.document_id, message.message, message.n_results),
+                run_query
+            )
         
         # Update conversation history
-        session["conversation_history"].append({
+        conversation_history.append({
             "role": "user",
             "content": message.message
         })
-        session["conversation_history"].append({
+        conversation_history.append({
             "role": "assistant",
             "content": answer
         })
         
-        # Keep history manageable
-        if len(session["conversation_history"]) > 20:
-            session["conversation_history"] = session["conversation_history"][-20:]
-        
         return ChatResponse(
             response=answer,
             references=references
@@ -294,31 +764,27 @@ async def websocket_chat(websocket: WebSocket, document_id: str):
     """
     await websocket.accept()
     
+    # A document still being processed streams its progress first
     if document_id not in sessions:
-        await websocket.send_json({
-            "type": "error",
-            "message": "Document not found"
-        })
-        await websocket.close()
-        return
+        try:
+            ready = await stream_processing_status(websocket, document_id)
+        except (WebSocketDisconnect, RuntimeError):
+            return
+        
+        if not ready:
+            await websocket.close()
+            return
     
     session = sessions[document_id]
-    collection_name = session["collection_name"]
-    extraction_dir = session["extraction_dir"]
     
     # Initialize RAG system
     try:
-        rag = RAGQuerySystem(
-            db_path="./chroma_db",
-            collection_name=collection_name,
-            output_dir=extraction_dir,
-            use_azure=True
-        )
+        rag = await get_rag_system(document_id)
         
         # Initialize conversation history for this websocket session
-        conversation_history = []
+        conversation_history = deque(maxlen=MAX_HISTORY_MESSAGES)
         
-        await websocket.send_json({
+        await send_ws_json(websocket, {
             "type": "connected",
             "message": "Connected to chat",
             "document_info": {
@@ -330,25 +796,28 @@ async def websocket_chat(websocket: WebSocket, document_id: str):
         while True:
             try:
                 # Receive message from client
-                data = await websocket.receive_json()
+                data = await receive_ws_json(websocket)
                 
                 if data.get("type") == "chat":
                     message = data.get("message", "")
                     
                     # Send processing status
-                    await websocket.send_json({
+                    await send_ws_json(websocket, {
                         "type": "processing",
                         "message": "Thinking..."
                     })
                     
-                    # Query using existing logic
-                    answer, references = rag.query(
-                        message,
-                        n_results=10,
-                        verbose=False,
-                        conversation_history=conversation_history,
-                        return_references=True
-                    )
+                    # Stream the answer as it is generated, with heartbeats so
+                    # the client can tell the socket is alive until it starts
+                    heartbeat = asyncio.create_task(send_heartbeats(websocket))
+                    try:
+                        answer, references = await stream_answer(
+                            websocket, rag, document_id, message,
+                            10, trim_history(conversation_history),
+                            on_start=heartbeat.cancel
+                        )
+                    finally:
+                        heartbeat.cancel()
                     
                     # Update conversation history
                     conversation_history.append({
@@ -360,20 +829,9 @@ async def websocket_chat(websocket: WebSocket, document_id: str):
                         "content": answer
                     })
                     
-                    # Keep history manageable
-                    if len(conversation_history) > 20:
-                        conversation_history = conversation_history[-20:]
-                    
-                    # Send response
-                    await websocket.send_json({
-                        "type": "response",
-                        "message": answer,
-                        "references": references
-                    })
-                    
                 elif data.get("type") == "reset":
-                    conversation_history = []
-                    await websocket.send_json({
+                    conversation_history.clear()
+                    await send_ws_json(websocket, {
                         "type": "reset",
                         "message": "Conversation reset"
                     })
@@ -381,13 +839,13 @@ async def websocket_chat(websocket: WebSocket, document_id: str):
             except WebSocketDisconnect:
                 break
             except Exception as e:
-                await websocket.send_json({
+                await send_ws_json(websocket, {
                     "type": "error",
                     "message": f"Error: {str(e)}"
                 })
                 
     except Exception as e:
-        await websocket.send_json({
+        await send_ws_json(websocket, {
             "type": "error",
             "message": f"Failed to initialize chat: {str(e)}"
         })
@@ -410,7 +868,7 @@ async def list_sessions():
 
 
 @app.delete("/session/{document_id}")
-async def delete_session(document_id: str):
+async def delete_session(document_id: str, background_tasks: BackgroundTasks):
     """Delete a session and its data."""
     if document_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -420,16 +878,23 @@ async def delete_session(document_id: str):
     # Clean up files
     try:
         upload_path = Path(session["upload_path"])
-        if upload_path.exists():
-            upload_path.unlink()
+        await asyncio.to_thread(upload_path.unlink, missing_ok=True)
         
+        # Renamed out of the way right away; the (possibly large) tree of
+        # figures and tables is removed after the response is sent
         extraction_dir = Path(session["extraction_dir"])
         if extraction_dir.exists():
-            import shutil
-            shutil.rmtree(extraction_dir)
+            deleting_dir = extraction_dir.with_name(f"{extraction_dir.name}.deleting")
+            extraction_dir.rename(deleting_dir)
+            background_tasks.add_task(shutil.rmtree, deleting_dir, ignore_errors=True)
         
         # Remove from sessions
         del sessions[document_id]
+        conversation_histories.pop(document_id, None)
+        close_rag_system(document_id)
+        sessions.delete_status(document_id)
+        response_cache.invalidate(document_id)
+        semantic_cache.invalidate(document_id)
         
         return {"message": "Session deleted successfully"}
         
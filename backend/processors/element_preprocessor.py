@@ -3,8 +3,10 @@ Element processing utilities for PDF extraction.
 Handles preprocessing, containment rules, and adjacency detection.
 """
 
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Sequence, Tuple
 from dataclasses import dataclass
+
+import numpy as np
 from unstructured.documents.elements import (
     Element,
     Image as UnstructuredImage,
@@ -15,30 +17,146 @@ from unstructured.documents.elements import (
 )
 from core.pdf_extraction_config import PDFConstants
 from core.pdf_extraction_models import ElementInfo, BoundingBox, BoundingBoxLegacy
-from utils.bbox_operations import BoundingBoxOperations, BoundingBoxCalculator
-from utils.caption_detector import CaptionDetector, CaptionExtractor
+from utils.bbox_operations import BoundingBoxOperations, BoundingBoxCalculator, BoxIndex
+from utils.caption_detector import CaptionDetector, CaptionExtractor, CaptionIndex
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _apply_rules(x_min: np.ndarray, y_min: np.ndarray, x_max: np.ndarray, y_max: np.ndarray,
+                 page_starts: np.ndarray, page_ends: np.ndarray, caption_ids: np.ndarray,
+                 tolerance: float, max_gap: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Containment, same-caption and adjacency rules over all element pairs.
+    
+    Elements are grouped by page: the elements on element i's page are
+    page_starts[i]:page_ends[i]. caption_ids holds one id per distinct
+    caption (-1 for none). Returns (skip, merge), where merge is the position
+    to merge with or -1. Compiled with numba when it is installed.
+    """
+    count = len(x_min)
+    skip = np.zeros(count, dtype=np.bool_)
+    merge = np.full(count, -1, dtype=np.int64)
+    
+    for i in range(count):
+        for j in range(page_starts[i], page_ends[i]):
+            if (j != i and not skip[j] and
+                    x_min[i] >= x_min[j] - tolerance and y_min[i] >= y_min[j] - tolerance and
+                    x_max[i] <= x_max[j] + tolerance and y_max[i] <= y_max[j] + tolerance):
+                skip[i] = True
+                break
+        
+        if skip[i] or caption_ids[i] < 0:
+            continue
+        
+        area = (x_max[i] - x_min[i]) * (y_max[i] - y_min[i])
+        for j in range(page_starts[i], page_ends[i]):
+            if (j != i and not skip[j] and caption_ids[j] == caption_ids[i] and
+                    area < (x_max[j] - x_min[j]) * (y_max[j] - y_min[j])):
+                skip[i] = True
+                break
+    
+    for i in range(count):
+        if skip[i] or caption_ids[i] >= 0:
+            continue
+        
+        for j in range(page_starts[i], page_ends[i]):
+            if j == i or skip[j] or merge[j] >= 0 or caption_ids[j] < 0:
+                continue
+            
+            vertical_gap = min(abs(y_min[i] - y_max[j]), abs(y_min[j] - y_max[i]))
+            horizontal_gap = min(abs(x_min[i] - x_max[j]), abs(x_min[j] - x_max[i]))
+            has_horizontal_overlap = not (x_max[i] < x_min[j] or x_max[j] < x_min[i])
+            has_vertical_overlap = not (y_max[i] < y_min[j] or y_max[j] < y_min[i])
+            
+            if ((vertical_gap <= max_gap and has_horizontal_overlap) or
+                    (horizontal_gap <= max_gap and has_vertical_overlap)):
+                merge[i] = j
+                break
+    
+    return skip, merge
+
+
+if njit is not None:
+    _apply_rules = njit(cache=True)(_apply_rules)
+
+
+def _apply_rules_compiled(boxes: Sequence[BoundingBox], pages: Sequence[int],
+                          captions: Sequence[Optional[str]], tolerance: float,
+                          max_gap: float) -> Tuple[List[bool], List[int]]:
+    """Run the compiled rule kernel; returns (skip, merge position or -1) per element.
+    
+    Captions are mapped to dense integer ids so the kernel compares ints
+    instead of strings. Elements are stably sorted by page, which keeps
+    their relative order within each page, and the results are mapped back.
+    """
+    count = len(boxes)
+    caption_ids: Dict[str, int] = {}
+    caption_array = np.fromiter(
+        (caption_ids.setdefault(caption, len(caption_ids)) if caption else -1 for caption in captions),
+        dtype=np.int64, count=count
+    )
+    
+    order = np.argsort(np.asarray(pages, dtype=np.int64), kind='stable')
+    sorted_pages = np.asarray(pages, dtype=np.int64)[order]
+    coordinates = np.array([(box.x_min, box.y_min, box.x_max, box.y_max) for box in boxes],
+                           dtype=np.float64).reshape(-1, 4)[order]
+    
+    sorted_skip, sorted_merge = _apply_rules(
+        np.ascontiguousarray(coordinates[:, 0]), np.ascontiguousarray(coordinates[:, 1]),
+        np.ascontiguousarray(coordinates[:, 2]), np.ascontiguousarray(coordinates[:, 3]),
+        np.searchsorted(sorted_pages, sorted_pages, side='left'),
+        np.searchsorted(sorted_pages, sorted_pages, side='right'),
+        caption_array[order], float(tolerance), float(max_gap)
+    )
+    
+    skip = np.zeros(count, dtype=bool)
+    skip[order] = sorted_skip
+    merge = np.full(count, -1, dtype=np.int64)
+    merge[order] = np.where(sorted_merge >= 0, order[np.maximum(sorted_merge, 0)], -1)
+    return skip.tolist(), merge.tolist()
 
 
 class ElementProcessor:
     """Processes elements for extraction (used by extract_all_elements.py)."""
     
     @staticmethod
-    def preprocess_elements(elements: List[Element]) -> List[ElementInfo]:
-        """Preprocess elements applying containment and adjacency rules."""
-        elements_with_bbox = ElementProcessor._build_element_list(elements)
-        ElementProcessor._apply_containment_rules(elements_with_bbox, elements)
-        ElementProcessor._apply_adjacency_rules(elements_with_bbox, elements)
+    def preprocess_elements(elements: List[Element],
+                            captions: Optional[CaptionIndex] = None,
+                            visual_indices: Optional[Sequence[int]] = None) -> List[ElementInfo]:
+        """Preprocess elements applying containment and adjacency rules.
+        
+        Pass `captions` to share caption lookups with later processing steps,
+        and `visual_indices` (ascending indices of image/figure/table elements)
+        when the caller has already classified the elements.
+        """
+        if captions is None:
+            captions = CaptionIndex(elements)
+        
+        elements_with_bbox = ElementProcessor._build_element_list(elements, visual_indices)
+        if njit is not None:
+            ElementProcessor._apply_rules_compiled(elements_with_bbox, captions)
+            return elements_with_bbox
+        
+        box_index = ElementProcessor._build_box_index(elements_with_bbox)
+        ElementProcessor._apply_containment_rules(elements_with_bbox, captions, box_index)
+        ElementProcessor._apply_adjacency_rules(elements_with_bbox, captions, box_index)
         return elements_with_bbox
     
     @staticmethod
-    def _build_element_list(elements: List[Element]) -> List[ElementInfo]:
+    def _build_element_list(elements: List[Element],
+                            visual_indices: Optional[Sequence[int]] = None) -> List[ElementInfo]:
         """Build list of visual elements with bounding boxes."""
+        if visual_indices is None:
+            visual_indices = [idx for idx, element in enumerate(elements)
+                              if ElementProcessor._should_process_element(element)]
+        
         elements_with_bbox = []
         
-        for idx, element in enumerate(elements):
-            if not ElementProcessor._should_process_element(element):
-                continue
-            
+        for idx in visual_indices:
+            element = elements[idx]
             bbox = BoundingBoxCalculator.extract_from_element(element)
             page = ElementProcessor._get_page_number(element)
             
@@ -67,35 +185,68 @@ class ElementProcessor:
     
     @staticmethod
     def _apply_containment_rules(elements_with_bbox: List[ElementInfo],
-                                original_elements: List[Element]) -> None:
-        """Apply rules for contained elements and same-caption duplicates."""
+                                captions: CaptionIndex,
+                                box_index: Optional[BoxIndex] = None) -> None:
+        """Apply rules for contained elements and same-caption duplicates.
+        
+        An element is skipped if any other unskipped element on its page
+        contains it or has the same caption and a larger area. Containers
+        come from the spatial index (checked with vectorized comparisons) and
+        same-caption elements from a caption lookup, instead of checking
+        every pair on the page.
+        """
+        if box_index is None:
+            box_index = ElementProcessor._build_box_index(elements_with_bbox)
+        
+        # Positions of elements sharing each (page, caption)
+        same_caption: Dict[Tuple[int, str], List[int]] = {}
+        for position, elem in enumerate(elements_with_bbox):
+            caption = captions.find_for_element(elem.index, elem.page).text
+            if caption:
+                same_caption.setdefault((elem.page, caption), []).append(position)
+        
         for i, elem1 in enumerate(elements_with_bbox):
             if elem1.skip:
                 continue
             
-            caption1_info = CaptionExtractor.find_for_element(
-                original_elements, elem1.index, elem1.page
-            )
+            if any(j != i and not elements_with_bbox[j].skip
+                   for j in box_index.containers(elem1.bbox, elem1.page,
+                                                 PDFConstants.CONTAINMENT_TOLERANCE)):
+                elem1.skip = True
+                continue
             
-            for j, elem2 in enumerate(elements_with_bbox):
-                if i == j or elem2.skip or elem1.page != elem2.page:
-                    continue
-                
-                if BoundingBoxCalculator.is_contained(elem1.bbox, elem2.bbox):
-                    elem1.skip = True
-                    break
-                
-                caption2_info = CaptionExtractor.find_for_element(
-                    original_elements, elem2.index, elem2.page
-                )
-                
-                if ElementProcessor._should_skip_duplicate_caption(
-                    caption1_info.text, caption2_info.text, 
-                    elem1.bbox, elem2.bbox
+            caption1 = captions.find_for_element(elem1.index, elem1.page).text
+            if not caption1:
+                continue
+            
+            for j in same_caption[(elem1.page, caption1)]:
+                elem2 = elements_with_bbox[j]
+                if i != j and not elem2.skip and ElementProcessor._should_skip_duplicate_caption(
+                    caption1, caption1, elem1.bbox, elem2.bbox
                 ):
                     elem1.skip = True
                     break
     
+    @staticmethod
+    def _apply_rules_compiled(elements_with_bbox: List[ElementInfo], captions: CaptionIndex) -> None:
+        """Apply containment and adjacency rules in one compiled pass."""
+        skip, merge = _apply_rules_compiled(
+            [elem.bbox for elem in elements_with_bbox],
+            [elem.page for elem in elements_with_bbox],
+            [captions.find_for_element(elem.index, elem.page).text for elem in elements_with_bbox],
+            PDFConstants.CONTAINMENT_TOLERANCE, PDFConstants.ADJACENCY_THRESHOLD
+        )
+        for elem, should_skip, position in zip(elements_with_bbox, skip, merge):
+            elem.skip = should_skip
+            if position >= 0:
+                elem.merge_with = elements_with_bbox[position].index
+    
+    @staticmethod
+    def _build_box_index(elements_with_bbox: List[ElementInfo]) -> BoxIndex:
+        """Spatial index over the elements' bounding boxes, by page."""
+        return BoxIndex([elem.bbox for elem in elements_with_bbox],
+                        [elem.page for elem in elements_with_bbox])
+    
     @staticmethod
     def _should_skip_duplicate_caption(caption1: Optional[str], 
                                       caption2: Optional[str],
@@ -108,38 +259,45 @@ class ElementProcessor:
     
     @staticmethod
     def _apply_adjacency_rules(elements_with_bbox: List[ElementInfo],
-                              original_elements: List[Element]) -> None:
-        """Apply rules for merging adjacent elements when one lacks caption."""
+                              captions: CaptionIndex,
+                              box_index: Optional[BoxIndex] = None) -> None:
+        """Apply rules for merging adjacent elements when one lacks caption.
+        
+        Candidates are the adjacent elements from the spatial index, in
+        their original order.
+        """
+        if box_index is None:
+            box_index = ElementProcessor._build_box_index(elements_with_bbox)
+        
         for i, elem1 in enumerate(elements_with_bbox):
             if elem1.skip or elem1.merge_with is not None:
                 continue
             
-            caption1_info = CaptionExtractor.find_for_element(
-                original_elements, elem1.index, elem1.page
+            caption1_info = captions.find_for_element(
+                elem1.index, elem1.page
             )
             
             if caption1_info.text:
                 continue
             
-            for j, elem2 in enumerate(elements_with_bbox):
-                if (i == j or elem2.skip or elem2.merge_with is not None or
-                    elem1.page != elem2.page):
+            for j in box_index.adjacent(elem1.bbox, elem1.page, PDFConstants.ADJACENCY_THRESHOLD):
+                elem2 = elements_with_bbox[j]
+                if i == j or elem2.skip or elem2.merge_with is not None:
                     continue
                 
-                if BoundingBoxCalculator.are_adjacent(elem1.bbox, elem2.bbox):
-                    caption2_info = CaptionExtractor.find_for_element(
-                        original_elements, elem2.index, elem2.page
-                    )
-                    
-                    if caption2_info.text:
-                        elem1.merge_with = elem2.index
-                        break
+                caption2_info = captions.find_for_element(
+                    elem2.index, elem2.page
+                )
+                
+                if caption2_info.text:
+                    elem1.merge_with = elem2.index
+                    break
 
 
 class ElementPreprocessor:
     """Preprocesses elements to handle containment and adjacency rules (hybrid extractor)."""
     
-    @dataclass
+    @dataclass(slots=True)
     class ProcessedElement:
         element: Element
         original_index: int
@@ -149,10 +307,20 @@ class ElementPreprocessor:
     def __init__(self, elements: List[Element]):
         self.elements = elements
         self.processed_elements: List[self.ProcessedElement] = []
+        self._box_index: Optional[BoxIndex] = None
+        self._caption_cache: Dict[int, Optional[str]] = {}
         
     def preprocess(self) -> List[Tuple[Element, int, bool, Optional[int]]]:
         """Preprocess elements applying containment and adjacency rules."""
+        self._caption_cache.clear()
         elements_with_bounding_boxes = self._build_elements_with_bboxes()
+        if njit is not None:
+            self._apply_rules_compiled(elements_with_bounding_boxes)
+            return [(elem.element, elem.original_index, elem.should_skip, elem.merge_with_index)
+                    for elem in self.processed_elements]
+        
+        self._box_index = BoxIndex([info['bounding_box'] for info in elements_with_bounding_boxes],
+                                   [info['page'] for info in elements_with_bounding_boxes])
         self._apply_containment_rules(elements_with_bounding_boxes)
         self._apply_adjacency_rules(elements_with_bounding_boxes)
         
@@ -204,41 +372,58 @@ class ElementPreprocessor:
             return element.metadata.page_number
         return 1
     
+    def _apply_rules_compiled(self, elements_with_bboxes: List[Dict]) -> None:
+        """Apply containment and adjacency rules in one compiled pass."""
+        skip, merge = _apply_rules_compiled(
+            [info['bounding_box'] for info in elements_with_bboxes],
+            [info['page'] for info in elements_with_bboxes],
+            [self._get_element_caption(info) for info in elements_with_bboxes],
+            PDFConstants.BBOX_TOLERANCE, PDFConstants.MAX_ADJACENCY_GAP
+        )
+        for info, processed, should_skip, position in zip(elements_with_bboxes, self.processed_elements,
+                                                          skip, merge):
+            info['skip'] = processed.should_skip = should_skip
+            if position >= 0:
+                info['merge_with'] = processed.merge_with_index = elements_with_bboxes[position]['index']
+    
     def _apply_containment_rules(self, elements_with_bboxes: List[Dict]) -> None:
-        """Apply rules for contained elements and same-caption duplicates."""
+        """Apply rules for contained elements and same-caption duplicates.
+        
+        Containers are looked up in the spatial index; the caption check
+        still compares against every element on the page.
+        """
         for i, first_element in enumerate(elements_with_bboxes):
             if first_element['skip']:
                 continue
             
+            if any(j != i and not elements_with_bboxes[j]['skip']
+                   for j in self._box_index.containers(first_element['bounding_box'], first_element['page'],
+                                                       PDFConstants.BBOX_TOLERANCE)):
+                first_element['skip'] = True
+                self.processed_elements[i].should_skip = True
+                continue
+            
             first_caption = self._get_element_caption(first_element)
             
-            for j, second_element in enumerate(elements_with_bboxes):
+            for j in self._box_index.on_page(first_element['page']):
+                second_element = elements_with_bboxes[j]
                 if i == j or second_element['skip']:
                     continue
                 
-                if first_element['page'] != second_element['page']:
-                    continue
-                
-                if self._should_skip_contained_element(first_element, second_element):
-                    first_element['skip'] = True
-                    self.processed_elements[i].should_skip = True
-                    break
-                
                 if self._should_skip_duplicate_caption(first_element, second_element, first_caption):
                     first_element['skip'] = True
                     self.processed_elements[i].should_skip = True
                     break
     
     def _get_element_caption(self, element_info: Dict) -> Optional[str]:
-        """Get caption for an element."""
-        caption, _, _, _ = CaptionDetector.find_caption_and_description(
-            self.elements, element_info['index'], element_info['page']
-        )
-        return caption
-    
-    def _should_skip_contained_element(self, first: Dict, second: Dict) -> bool:
-        """Check if first element should be skipped because it's contained in second."""
-        return BoundingBoxOperations.is_contained_within(first['bounding_box'], second['bounding_box'])
+        """Get caption for an element, computed once per element per preprocess pass."""
+        index = element_info['index']
+        if index not in self._caption_cache:
+            caption, _, _, _ = CaptionDetector.find_caption_and_description(
+                self.elements, index, element_info['page']
+            )
+            self._caption_cache[index] = caption
+        return self._caption_cache[index]
     
     def _should_skip_duplicate_caption(self, first: Dict, second: Dict, first_caption: Optional[str]) -> bool:
         """Check if first element should be skipped due to duplicate caption."""
@@ -271,13 +456,11 @@ class ElementPreprocessor:
                 self.processed_elements[i].merge_with_index = merge_target['index']
     
     def _find_adjacent_element_with_caption(self, target_element: Dict, all_elements: List[Dict]) -> Optional[Dict]:
-        """Find adjacent element with caption for merging."""
-        for candidate in all_elements:
-            if (candidate['skip'] or candidate['merge_with'] is not None or
-                candidate['page'] != target_element['page']):
-                continue
-            
-            if not BoundingBoxOperations.are_adjacent(target_element['bounding_box'], candidate['bounding_box']):
+        """Find adjacent element with caption for merging (the first one in element order)."""
+        for position in self._box_index.adjacent(target_element['bounding_box'], target_element['page'],
+                                                 PDFConstants.MAX_ADJACENCY_GAP):
+            candidate = all_elements[position]
+            if candidate['skip'] or candidate['merge_with'] is not None:
                 continue
             
             candidate_caption = self._get_element_caption(candidate)
@@ -3,12 +3,33 @@ Image extraction utilities for PDF processing.
 Handles extraction of images from PDF pages using PyMuPDF.
 """
 
+import os
+from functools import lru_cache
+
 import fitz
-from typing import Optional
+from PIL import Image
+from typing import List, Optional, Sequence, Tuple
 from core.pdf_extraction_config import PDFConstants
 from core.pdf_extraction_models import BoundingBoxLegacy as BoundingBox
 
 
+@lru_cache(maxsize=4)
+def _open_document(pdf_path: str, mtime: float) -> fitz.Document:
+    """Open a PDF once per (path, modification time).
+    
+    Repeated region extractions from the same file reuse the parsed document;
+    rewriting the file changes its mtime and so opens it afresh. Documents
+    are never closed explicitly: one dropped from the cache is released once
+    the last render using it finishes, so callers must not close them either.
+    """
+    return fitz.open(pdf_path)
+
+
+def _cached_document(pdf_path: str) -> fitz.Document:
+    """Cached open document for pdf_path."""
+    return _open_document(pdf_path, os.path.getmtime(pdf_path))
+
+
 class ImageExtractor:
     """Extracts images from PDF pages using PyMuPDF."""
     
@@ -29,28 +50,148 @@ class ImageExtractor:
             True if successful, False otherwise
         """
         try:
-            doc = fitz.open(pdf_path)
-            page = doc[page_num - 1]
+            document = _cached_document(pdf_path)
+        except Exception:
+            _open_document.cache_clear()
+            return False
+        
+        # Render errors are reported as False; don't keep a possibly broken document
+        if not ImageExtractor.extract_from_document(document, bbox, page_num, output_path, dpi):
+            _open_document.cache_clear()
+            return False
+        return True
+    
+    @staticmethod
+    def close_all() -> None:
+        """Drop the documents cached by extract_from_pdf and extract_region."""
+        _open_document.cache_clear()
+    
+    @staticmethod
+    def extract_from_document(document: fitz.Document, bbox: BoundingBox, page_num: int,
+                              output_path: str, dpi: int = PDFConstants.HIGH_DPI) -> bool:
+        """
+        Extract image from an already opened PDF document.
+        
+        Lets callers rendering many regions parse the PDF once; the
+        document is left open.
+        
+        Args:
+            document: Open PyMuPDF document
+            bbox: Bounding box coordinates for image region
+            page_num: Page number (1-indexed)
+            output_path: Path to save extracted image
+            dpi: DPI for image extraction
             
-            scaled_rect = fitz.Rect(
-                bbox.x0 * PDFConstants.COORDINATE_SCALE_FACTOR,
-                bbox.y0 * PDFConstants.COORDINATE_SCALE_FACTOR,
-                bbox.x1 * PDFConstants.COORDINATE_SCALE_FACTOR,
-                bbox.y1 * PDFConstants.COORDINATE_SCALE_FACTOR
-            )
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            page = document[page_num - 1]
+        except Exception:
+            return False
+        
+        return ImageExtractor.extract_from_page(page, bbox, output_path, dpi)
+    
+    @staticmethod
+    def page_rect(bbox: BoundingBox, page: fitz.Page) -> fitz.Rect:
+        """Convert an unstructured bounding box to a PyMuPDF rect clipped to the page."""
+        scaled_rect = fitz.Rect(
+            bbox.x0 * PDFConstants.COORDINATE_SCALE_FACTOR,
+            bbox.y0 * PDFConstants.COORDINATE_SCALE_FACTOR,
+            bbox.x1 * PDFConstants.COORDINATE_SCALE_FACTOR,
+            bbox.y1 * PDFConstants.COORDINATE_SCALE_FACTOR
+        )
+        
+        scaled_rect.intersect(page.rect)
+        return scaled_rect
+    
+    @staticmethod
+    def extract_from_page(page: fitz.Page, bbox: BoundingBox, output_path: str,
+                          dpi: int = PDFConstants.HIGH_DPI,
+                          compress_level: Optional[int] = None) -> bool:
+        """
+        Extract image from an already loaded PDF page.
+        
+        Args:
+            page: Loaded PyMuPDF page
+            bbox: Bounding box coordinates for image region
+            output_path: Path to save extracted image
+            dpi: DPI for image extraction
+            compress_level: PNG zlib level; if given the PNG is encoded by Pillow
+                with that level instead of by PyMuPDF
             
-            scaled_rect.intersect(page.rect)
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            scaled_rect = ImageExtractor.page_rect(bbox, page)
             
             zoom_factor = dpi / 72.0
             mat = fitz.Matrix(zoom_factor, zoom_factor)
             pix = page.get_pixmap(matrix=mat, clip=scaled_rect, alpha=False)
             
-            pix.save(output_path)
-            doc.close()
+            if compress_level is None:
+                pix.save(output_path)
+            else:
+                pix.pil_save(output_path, format="PNG", compress_level=compress_level)
             return True
             
         except Exception:
             return False
+    
+    @staticmethod
+    def extract_many_from_page(page: fitz.Page, regions: Sequence[Tuple[BoundingBox, str]],
+                               dpi: int = PDFConstants.HIGH_DPI,
+                               compress_level: Optional[int] = None) -> List[bool]:
+        """
+        Extract several regions of one page from a single render.
+        
+        With more than one region the page is rasterized once at dpi and
+        every region is cropped out of that bitmap; a single region renders
+        just its clip, which is cheaper than the whole page.
+        
+        Args:
+            page: Loaded PyMuPDF page
+            regions: (bounding box, output path) pairs
+            dpi: DPI for image extraction
+            compress_level: PNG zlib level passed to Pillow
+            
+        Returns:
+            Success flag for each region, in order
+        """
+        if len(regions) == 1:
+            bbox, output_path = regions[0]
+            return [ImageExtractor.extract_from_page(page, bbox, output_path, dpi, compress_level)]
+        
+        zoom_factor = dpi / 72.0
+        matrix = fitz.Matrix(zoom_factor, zoom_factor)
+        
+        try:
+            pixmap = page.get_pixmap(matrix=matrix, alpha=False)
+            page_image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        except Exception:
+            return [False] * len(regions)
+        
+        return [ImageExtractor._save_crop(page_image, page, bbox, output_path, matrix, compress_level)
+                for bbox, output_path in regions]
+    
+    @staticmethod
+    def _save_crop(page_image: Image.Image, page: fitz.Page, bbox: BoundingBox, output_path: str,
+                   matrix: fitz.Matrix, compress_level: Optional[int] = None) -> bool:
+        """Cut a region out of a rendered page and save it as PNG."""
+        try:
+            pixel_rect = (ImageExtractor.page_rect(bbox, page) * matrix).irect
+            left, top = max(pixel_rect.x0, 0), max(pixel_rect.y0, 0)
+            right = min(pixel_rect.x1, page_image.width)
+            bottom = min(pixel_rect.y1, page_image.height)
+            if right <= left or bottom <= top:
+                return False
+            
+            save_options = {} if compress_level is None else {"compress_level": compress_level}
+            page_image.crop((left, top, right, bottom)).save(output_path, "PNG", **save_options)
+            return True
+        except Exception:
+            return False
 
 
 class PDFRegionExtractor:
@@ -81,25 +222,24 @@ class PDFRegionExtractor:
                       output_path: str, dpi: int = PDFConstants.DEFAULT_DPI) -> bool:
         """Extract a region from PDF using PyMuPDF with proper scaling (hybrid extractor compatibility)."""
         try:
-            with fitz.open(pdf_path) as document:
-                page = document[page_number - 1]
-                
-                scaled_rectangle = fitz.Rect(
-                    bounding_box.x_min * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
-                    bounding_box.y_min * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
-                    bounding_box.x_max * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
-                    bounding_box.y_max * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE
-                )
-                
-                scaled_rectangle.intersect(page.rect)
-                
-                zoom_factor = dpi / 72.0
-                transformation_matrix = fitz.Matrix(zoom_factor, zoom_factor)
-                pixmap = page.get_pixmap(matrix=transformation_matrix, clip=scaled_rectangle, alpha=False)
-                
-                pixmap.save(output_path)
-                
+            page = _cached_document(pdf_path)[page_number - 1]
+            
+            scaled_rectangle = fitz.Rect(
+                bounding_box.x_min * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
+                bounding_box.y_min * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
+                bounding_box.x_max * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE,
+                bounding_box.y_max * PDFConstants.UNSTRUCTURED_TO_PYMUPDF_SCALE
+            )
+            
+            scaled_rectangle.intersect(page.rect)
+            
+            zoom_factor = dpi / 72.0
+            transformation_matrix = fitz.Matrix(zoom_factor, zoom_factor)
+            pixmap = page.get_pixmap(matrix=transformation_matrix, clip=scaled_rectangle, alpha=False)
+            
+            pixmap.save(output_path)
             return True
             
         except Exception:
+            _open_document.cache_clear()
             return False
\ No newline at end of file
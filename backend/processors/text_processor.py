@@ -3,10 +3,48 @@ Text processing utilities for PDF extraction.
 Handles text matching, similarity calculation, and filtering.
 """
 
-from typing import List, Optional
-from core.pdf_extraction_models import TextElement, ElementMetadata, BoundingBox
+from dataclasses import replace
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.pdf_extraction_models import BoundingBoxArray, TextElement, TextElementBatch, ElementMetadata
 from core.pdf_extraction_config import PDFConstants
-from utils.bbox_operations import BoundingBoxOperations
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+
+def _contains_any(text_coordinates: np.ndarray, visual_coordinates: np.ndarray,
+                  offsets: np.ndarray, candidates: np.ndarray, tolerance: float) -> np.ndarray:
+    """Check each text box against its candidate visual boxes.
+    
+    Coordinates are (x_min, y_min, x_max, y_max) rows. The candidates of text
+    box i are candidates[offsets[i]:offsets[i + 1]]. Compiled with numba when
+    it is installed.
+    """
+    text_count = len(offsets) - 1
+    inside = np.zeros(text_count, dtype=np.bool_)
+    
+    for text_index in prange(text_count):
+        for position in range(offsets[text_index], offsets[text_index + 1]):
+            visual_index = candidates[position]
+            if (text_coordinates[text_index, 0] >= visual_coordinates[visual_index, 0] - tolerance and
+                    text_coordinates[text_index, 1] >= visual_coordinates[visual_index, 1] - tolerance and
+                    text_coordinates[text_index, 2] <= visual_coordinates[visual_index, 2] + tolerance and
+                    text_coordinates[text_index, 3] <= visual_coordinates[visual_index, 3] + tolerance):
+                inside[text_index] = True
+                break
+    
+    return inside
+
+
+if njit is not None:
+    _contains_any = njit(parallel=True, cache=True)(_contains_any)
 
 
 class TextProcessor:
@@ -16,81 +54,179 @@ class TextProcessor:
         self.high_resolution_text_elements: List[TextElement] = []
         self.filtered_text_elements: List[TextElement] = []
     
+    # Cells per axis of the uniform grid used as containment broad phase
+    GRID_RESOLUTION = 64
+    
     def filter_text_within_visuals(self, 
-                                  fast_text_elements: List[TextElement],
+                                  fast_text_elements: Union[List[TextElement], TextElementBatch],
                                   figures: List[ElementMetadata],
                                   tables: List[ElementMetadata]) -> List[TextElement]:
-        """Filter out text elements that are inside figures or tables."""
-        filtered = []
+        """Filter out text elements that are inside figures or tables.
         
-        for text_element in fast_text_elements:
-            if not self._is_text_inside_visual_element(text_element, figures, tables):
-                filtered.append(text_element)
+        A uniform grid narrows each text element down to the visual elements
+        sharing its cell; containment is then checked for all candidate pairs
+        at once. Fast mode coordinates are already scaled to hi-res during
+        extraction, so no additional scaling is needed here.
+        """
+        if not isinstance(fast_text_elements, TextElementBatch):
+            fast_text_elements = TextElementBatch.from_elements(fast_text_elements)
         
-        return filtered
-    
-    def _is_text_inside_visual_element(self, 
-                                      text_element: TextElement,
-                                      figures: List[ElementMetadata],
-                                      tables: List[ElementMetadata]) -> bool:
-        """Check if text element is inside any visual element."""
-        if not text_element.bounding_box:
-            return False
-        
-        return (self._is_inside_figures(text_element, figures) or 
-                self._is_inside_tables(text_element, tables))
-    
-    def _is_inside_figures(self, text_element: TextElement, figures: List[ElementMetadata]) -> bool:
-        """Check if text is inside any figure."""
-        for figure in figures:
-            if (figure.page_number == text_element.page and 
-                figure.bounding_box and
-                self._is_text_inside_scaled_bbox(text_element, figure.bounding_box)):
-                return True
-        return False
+        elements = fast_text_elements.elements
+        visuals = [visual for visual in (*figures, *tables) if visual.bounding_box]
+        if not visuals or not elements:
+            return list(elements)
+        
+        visual_boxes = BoundingBoxArray.from_boxes([visual.bounding_box for visual in visuals])
+        visual_pages = np.fromiter((visual.page_number for visual in visuals),
+                                   dtype=np.int64, count=len(visuals))
+        
+        text_indices, visual_indices = self._grid_candidate_pairs(
+            fast_text_elements, visual_boxes, visual_pages
+        )
+        
+        if njit is not None:
+            inside_visual = self._contains_any_compiled(
+                fast_text_elements.boxes, visual_boxes, text_indices, visual_indices
+            )
+        else:
+            contained = fast_text_elements.boxes.take(text_indices).is_within(
+                visual_boxes.take(visual_indices)
+            )
+            inside_visual = np.zeros(len(elements), dtype=bool)
+            inside_visual[text_indices[contained]] = True
+        
+        return [elements[index] for index in np.flatnonzero(~inside_visual)]
     
-    def _is_inside_tables(self, text_element: TextElement, tables: List[ElementMetadata]) -> bool:
-        """Check if text is inside any table."""
-        for table in tables:
-            if (table.page_number == text_element.page and 
-                table.bounding_box and
-                self._is_text_inside_scaled_bbox(text_element, table.bounding_box)):
-                return True
-        return False
+    @staticmethod
+    def _contains_any_compiled(text_boxes: BoundingBoxArray, visual_boxes: BoundingBoxArray,
+                               text_indices: np.ndarray, visual_indices: np.ndarray) -> np.ndarray:
+        """Run the compiled containment kernel over the candidate pairs.
+        
+        Pairs are grouped per text element (text_indices is ascending), so the
+        kernel can stop at the first containing visual.
+        """
+        def stacked(boxes):
+            return np.column_stack((boxes.x_min, boxes.y_min, boxes.x_max, boxes.y_max))
+        
+        offsets = np.zeros(len(text_boxes) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(text_indices, minlength=len(text_boxes)), out=offsets[1:])
+        
+        return _contains_any(stacked(text_boxes), stacked(visual_boxes), offsets,
+                             visual_indices, PDFConstants.BBOX_TOLERANCE)
     
-    def _is_text_inside_scaled_bbox(self, text_element: TextElement, visual_bbox: BoundingBox) -> bool:
-        """Check if text is inside visual bounding box.
+    def _grid_candidate_pairs(self, text_batch: TextElementBatch,
+                              visual_boxes: BoundingBoxArray,
+                              visual_pages: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (text_indices, visual_indices) of pairs sharing a grid cell.
         
-        Since fast mode coordinates are now scaled to hi-res during extraction,
-        no additional scaling is needed here.
+        Visual boxes are widened by the containment tolerance and registered in
+        every cell they overlap. A contained text element's top-left corner
+        lies inside the widened box, so looking up only that corner's cell
+        never misses a containing visual.
         """
-        return BoundingBoxOperations.is_contained_within(text_element.bounding_box, visual_bbox)
+        resolution = self.GRID_RESOLUTION
+        tolerance = PDFConstants.BBOX_TOLERANCE
+        
+        visual_x_min = visual_boxes.x_min - tolerance
+        visual_y_min = visual_boxes.y_min - tolerance
+        origin_x = visual_x_min.min()
+        origin_y = visual_y_min.min()
+        cell_width = ((visual_boxes.x_max + tolerance).max() - origin_x) / resolution or 1.0
+        cell_height = ((visual_boxes.y_max + tolerance).max() - origin_y) / resolution or 1.0
+        
+        def cells(values, origin, cell_size):
+            return np.floor((values - origin) / cell_size)
+        
+        first_columns = cells(visual_x_min, origin_x, cell_width).astype(np.int64)
+        first_rows = cells(visual_y_min, origin_y, cell_height).astype(np.int64)
+        last_columns = np.minimum(
+            cells(visual_boxes.x_max + tolerance, origin_x, cell_width), resolution - 1
+        ).astype(np.int64)
+        last_rows = np.minimum(
+            cells(visual_boxes.y_max + tolerance, origin_y, cell_height), resolution - 1
+        ).astype(np.int64)
+        
+        grid = defaultdict(list)
+        for visual_index, page in enumerate(visual_pages.tolist()):
+            for row in range(first_rows[visual_index], last_rows[visual_index] + 1):
+                row_key = (page * resolution + row) * resolution
+                for column in range(first_columns[visual_index], last_columns[visual_index] + 1):
+                    grid[row_key + column].append(visual_index)
+        
+        # Text corners outside the grid (or without a box, i.e. NaN) have no candidates;
+        # the far edge is clamped into the last cell just like the visual boxes
+        text_columns = cells(text_batch.boxes.x_min, origin_x, cell_width)
+        text_rows = cells(text_batch.boxes.y_min, origin_y, cell_height)
+        on_grid = ((text_columns >= 0) & (text_columns <= resolution) &
+                   (text_rows >= 0) & (text_rows <= resolution))
+        
+        on_grid_indices = np.flatnonzero(on_grid)
+        text_columns = np.minimum(text_columns[on_grid_indices], resolution - 1).astype(np.int64)
+        text_rows = np.minimum(text_rows[on_grid_indices], resolution - 1).astype(np.int64)
+        text_keys = ((text_batch.pages[on_grid_indices].astype(np.int64) * resolution
+                      + text_rows) * resolution + text_columns)
+        
+        text_indices = []
+        visual_indices = []
+        for text_index, key in zip(on_grid_indices.tolist(), text_keys.tolist()):
+            candidates = grid.get(key)
+            if candidates:
+                text_indices.extend([text_index] * len(candidates))
+                visual_indices.extend(candidates)
+        
+        return (np.array(text_indices, dtype=np.intp),
+                np.array(visual_indices, dtype=np.intp))
     
     def match_detection_probabilities(self,
                                     filtered_text_elements: List[TextElement],
                                     high_resolution_text_elements: List[TextElement]) -> List[TextElement]:
-        """Match filtered text elements with high-resolution detection probabilities."""
+        """Match filtered text elements with high-resolution detection probabilities.
+        
+        Exact text matches on the same page are found with a dict lookup;
+        only elements without one are compared against the hi-res elements
+        of their page. Returns a new list; matched elements are replaced by
+        reclassified copies.
+        """
+        exact_matches: Dict[Tuple[int, str], TextElement] = {}
+        elements_by_page: Dict[int, List[Tuple[str, int, TextElement]]] = defaultdict(list)
+        for high_res_element in high_resolution_text_elements:
+            text = high_res_element.text.strip()
+            # The first element wins, as in a linear scan for the best score
+            exact_matches.setdefault((high_res_element.page, text), high_res_element)
+            elements_by_page[high_res_element.page].append((text, len(text), high_res_element))
+        
+        matched_elements = []
+        
         for fast_element in filtered_text_elements:
-            matching_element = self._find_matching_high_res_element(
-                fast_element, high_resolution_text_elements
-            )
+            fast_text = fast_element.text.strip()
+            matching_element = exact_matches.get((fast_element.page, fast_text))
+            if matching_element is None:
+                matching_element = self._find_matching_high_res_element(
+                    fast_text, elements_by_page.get(fast_element.page, ())
+                )
             if matching_element:
-                self._apply_high_res_classification(fast_element, matching_element)
+                fast_element = self._apply_high_res_classification(fast_element, matching_element)
+            matched_elements.append(fast_element)
         
-        return filtered_text_elements
+        return matched_elements
     
-    def _find_matching_high_res_element(self, 
-                                       fast_element: TextElement,
-                                       high_resolution_text_elements: List[TextElement]) -> Optional[TextElement]:
-        """Find matching high-resolution element for probability transfer."""
+    def _find_matching_high_res_element(self, fast_text: str,
+                                        page_elements: List[Tuple[str, int, TextElement]]) -> Optional[TextElement]:
+        """Find the best partial match among (stripped text, length, element) entries of one page.
+        
+        A partial match scores shorter/longer length, so candidates whose
+        length ratio cannot beat the best score so far skip the substring test.
+        """
         best_match = None
         best_similarity_score = 0
+        fast_length = len(fast_text)
         
-        for high_res_element in high_resolution_text_elements:
-            if high_res_element.page != fast_element.page:
+        for high_res_text, high_res_length, high_res_element in page_elements:
+            longer_length = max(fast_length, high_res_length)
+            if longer_length and min(fast_length, high_res_length) / longer_length <= best_similarity_score:
                 continue
             
-            similarity_score = self.calculate_text_similarity(fast_element.text, high_res_element.text)
+            similarity_score = self._stripped_text_similarity(fast_text, high_res_text)
             if similarity_score > best_similarity_score:
                 best_similarity_score = similarity_score
                 best_match = high_res_element
@@ -100,25 +236,38 @@ class TextProcessor:
     @staticmethod
     def calculate_text_similarity(fast_text: str, high_res_text: str) -> float:
         """Calculate similarity between two text strings."""
-        fast_text = fast_text.strip()
-        high_res_text = high_res_text.strip()
-        
+        return TextProcessor._stripped_text_similarity(fast_text.strip(), high_res_text.strip())
+    
+    @staticmethod
+    def _stripped_text_similarity(fast_text: str, high_res_text: str) -> float:
+        """Similarity of two already stripped strings."""
         if fast_text == high_res_text:
             return 1.0
         
-        if fast_text in high_res_text or high_res_text in fast_text:
-            overlap_length = min(len(fast_text), len(high_res_text))
-            return overlap_length / max(len(fast_text), len(high_res_text))
+        # Only the shorter string can be a substring of the other
+        if len(fast_text) <= len(high_res_text):
+            shorter_text, longer_text = fast_text, high_res_text
+        else:
+            shorter_text, longer_text = high_res_text, fast_text
+        
+        if shorter_text in longer_text:
+            return len(shorter_text) / len(longer_text)
         
         return 0.0
     
-    def _apply_high_res_classification(self, fast_element: TextElement, high_res_element: TextElement) -> None:
-        """Apply high-resolution classification to fast element."""
+    def _apply_high_res_classification(self, fast_element: TextElement,
+                                       high_res_element: TextElement) -> TextElement:
+        """Return a copy of fast element with the high-resolution classification applied."""
+        detection_probability = fast_element.detection_probability
         if high_res_element.detection_probability is not None:
-            fast_element.detection_probability = high_res_element.detection_probability
+            detection_probability = high_res_element.detection_probability
         
         # Keep fast mode bounding box coordinates for sections
         # Only update classification, not coordinates
         
-        fast_element.original_type = fast_element.element_type
-        fast_element.element_type = high_res_element.element_type
\ No newline at end of file
+        return replace(
+            fast_element,
+            detection_probability=detection_probability,
+            original_type=fast_element.element_type,
+            element_type=high_res_element.element_type
+        )
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Persistent cache for query embeddings.
+Asking a question that was embedded before (by any server process) skips the
+embedding API call.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = Path(".embed_cache") / "embeddings.sqlite3"
+
+
+def normalize_embeddings(vectors: Sequence[Sequence[float]]) -> List[List[float]]:
+    """L2-normalize embeddings so cosine distance reduces to a dot product."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    return matrix.tolist()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of float32 embeddings keyed by SHA-256 of model and text.
+    
+    Cache failures are reported and fall back to computing the embedding;
+    they never fail a query.
+    """
+    
+    def __init__(self, db_path: Union[str, Path] = DEFAULT_CACHE_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._connection = None
+        
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: embedding cache disabled ({self.db_path}): {e}")
+            self._connection = None
+    
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}|{text}".encode('utf-8')).hexdigest()
+    
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding, or None on a miss."""
+        if self._connection is None:
+            return None
+        
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (self._key(model, text),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Warning: could not read embedding cache: {e}")
+            return None
+        
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+    
+    def set(self, model: str, text: str, vector: Sequence[float]) -> None:
+        """Store an embedding as float32 bytes."""
+        if self._connection is None:
+            return
+        
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        try:
+            with self._lock:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (self._key(model, text), blob)
+                )
+                self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: could not write embedding cache: {e}")
+    
+    def embed(self, embedding_function: Callable[[List[str]], Sequence[Sequence[float]]],
+              model: str, text: str) -> List[float]:
+        """Return the embedding of text, calling embedding_function only on a miss."""
+        vector = self.get(model, text)
+        if vector is None:
+            # Rounded to float32 so a miss returns exactly what later hits will
+            vector = np.asarray(embedding_function([text])[0], dtype=np.float32).tolist()
+            self.set(model, text, vector)
+        return vector
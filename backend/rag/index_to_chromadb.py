@@ -9,10 +9,35 @@ import os
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Handle both module and direct imports
+try:
+    from .embedding_cache import normalize_embeddings
+except ImportError:
+    from embedding_cache import normalize_embeddings
+
+
+# Texts per embedding request, and embedding requests in flight at once
+EMBEDDING_BATCH_SIZE = 16
+EMBEDDING_CONCURRENCY = 8
+
+# Cosine space over unit-length embeddings; M and construction_ef trade a
+# slower build for better recall at query time
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32
+}
+
 
 class PDFMetadataIndexer:
     """Index PDF extraction metadata into ChromaDB."""
@@ -128,7 +153,7 @@ class PDFMetadataIndexer:
                 self.collection = self.client.create_collection(
                     name=self.collection_name,
                     embedding_function=self.embedding_function,
-                    metadata={"hnsw:space": "cosine"}
+                    metadata=COLLECTION_METADATA
                 )
                 print(f"Created new collection: {self.collection_name}")
             except Exception as create_error:
@@ -145,7 +170,7 @@ class PDFMetadataIndexer:
                     self.collection = self.client.create_collection(
                         name=self.collection_name,
                         embedding_function=self.embedding_function,
-                        metadata={"hnsw:space": "cosine"}
+                        metadata=COLLECTION_METADATA
                     )
                     print(f"Created new collection: {self.collection_name}")
                 except Exception as recreate_error:
@@ -187,6 +212,9 @@ class PDFMetadataIndexer:
         if not self.metadata_path.exists():
             raise FileNotFoundError(f"Metadata file not found: {self.metadata_path}")
         
+        if orjson is not None:
+            return orjson.loads(self.metadata_path.read_bytes())
+        
         with open(self.metadata_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
@@ -355,6 +383,25 @@ class PDFMetadataIndexer:
         
         return documents, metadatas, ids
     
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed documents with concurrent API requests.
+        
+        Args:
+            documents: Texts to embed
+            
+        Returns:
+            Normalized embeddings, in the same order as documents
+        """
+        batches = [documents[i:i + EMBEDDING_BATCH_SIZE]
+                   for i in range(0, len(documents), EMBEDDING_BATCH_SIZE)]
+        
+        # Embedding calls are network-bound, so threads overlap their latency
+        with ThreadPoolExecutor(max_workers=min(EMBEDDING_CONCURRENCY, len(batches) or 1)) as executor:
+            batch_embeddings = executor.map(self.embedding_function, batches)
+            embeddings = [vector for batch in batch_embeddings for vector in batch]
+        
+        return normalize_embeddings(embeddings)
+    
     def index_documents(self) -> Dict[str, int]:
         """Index all documents into ChromaDB.
         
@@ -372,6 +419,11 @@ class PDFMetadataIndexer:
             print("No documents to index!")
             return {"total": 0}
         
+        # Embed everything up front with concurrent requests; embeddings are
+        # stored unit-length and queries are normalized the same way
+        print(f"Embedding {len(documents)} documents...")
+        embeddings = self.embed_documents(documents)
+        
         # Add documents to collection in batches
         batch_size = 100
         total_indexed = 0
@@ -381,6 +433,7 @@ class PDFMetadataIndexer:
             
             self.collection.add(
                 documents=documents[i:batch_end],
+                embeddings=embeddings[i:batch_end],
                 metadatas=metadatas[i:batch_end],
                 ids=ids[i:batch_end]
             )
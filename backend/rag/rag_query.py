@@ -8,7 +8,7 @@ import os
 import json
 import base64
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 import chromadb
 from chromadb.config import Settings
@@ -17,6 +17,16 @@ from openai import AzureOpenAI, OpenAI
 from PIL import Image
 import io
 
+# Handle both module and direct imports
+try:
+    from .embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH, normalize_embeddings
+except ImportError:
+    from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH, normalize_embeddings
+
+
+# Prefix of the answer returned when the LLM call fails
+LLM_ERROR_PREFIX = "Error calling LLM: "
+
 
 class RAGQuerySystem:
     """RAG system for querying PDF content with visual elements."""
@@ -25,7 +35,8 @@ class RAGQuerySystem:
                  db_path: str = "./chroma_db",
                  collection_name: str = "pdf_documents",
                  output_dir: str = "output",
-                 use_azure: bool = True):
+                 use_azure: bool = True,
+                 embedding_cache_path: str = str(DEFAULT_CACHE_PATH)):
         """Initialize the RAG query system.
         
         Args:
@@ -33,6 +44,7 @@ class RAGQuerySystem:
             collection_name: Name of the ChromaDB collection
             output_dir: Directory containing extracted images
             use_azure: Whether to use Azure OpenAI
+            embedding_cache_path: SQLite file caching question embeddings
         """
         # Load environment variables
         load_dotenv()
@@ -77,23 +89,30 @@ class RAGQuerySystem:
                     api_version=embedding_api_version,
                     deployment_id=deployment_id
                 )
+                self.embedding_model = f"azure:{deployment_id}"
                 print(f"Using Azure OpenAI embeddings with deployment: {deployment_id}")
                 print(f"Embedding endpoint: {embedding_base}")
             else:
                 # Standard OpenAI embeddings
+                embedding_model_name = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
                 self.embedding_function = embedding_functions.OpenAIEmbeddingFunction(
                     api_key=os.environ.get("OPENAI_API_KEY"),
                     api_base=os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1"),
-                    model_name=os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+                    model_name=embedding_model_name
                 )
+                self.embedding_model = f"openai:{embedding_model_name}"
                 print(f"Using OpenAI embeddings")
         else:
             # Use SentenceTransformer as fallback
             self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
                 model_name="all-MiniLM-L6-v2"
             )
+            self.embedding_model = "sentence-transformers:all-MiniLM-L6-v2"
             print("Using SentenceTransformer embeddings")
         
+        # Question embeddings are reused across queries and server restarts
+        self.embedding_cache = EmbeddingCache(embedding_cache_path)
+        
         # Get collection
         try:
             self.collection = self.client.get_collection(
@@ -105,6 +124,11 @@ class RAGQuerySystem:
         except Exception as e:
             raise Exception(f"Failed to connect to collection '{self.collection_name}': {e}")
         
+        # Query embeddings are normalized for a cosine index; other spaces would rank differently
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        if space != "cosine":
+            print(f"Warning: collection '{self.collection_name}' uses '{space}' distance, expected 'cosine'; re-index the document")
+        
         # Initialize OpenAI client
         if use_azure:
             # Get endpoint from either AZURE_OPENAI_ENDPOINT or AZURE_OPENAI_API_BASE
@@ -161,6 +185,12 @@ class RAGQuerySystem:
             print(f"Error encoding image {image_path}: {e}")
             return None
     
+    def embed_query(self, query: str) -> List[float]:
+        """Return the normalized embedding of a question, from the embedding cache when possible."""
+        return normalize_embeddings([self.embedding_cache.embed(
+            self.embedding_function, self.embedding_model, query
+        )])[0]
+    
     def retrieve_context(self, query: str, n_results: int = 10) -> Tuple[List[Dict], List[Dict]]:
         """Retrieve relevant context from ChromaDB.
         
@@ -171,9 +201,9 @@ class RAGQuerySystem:
         Returns:
             Tuple of (text_contexts, visual_contexts)
         """
-        # Query the collection
+        # Query the collection with the (cached) question embedding
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[self.embed_query(query)],
             n_results=n_results
         )
         
@@ -340,20 +370,18 @@ class RAGQuerySystem:
         
         return [system_message, user_message]
     
-    def query(self, question: str, n_results: int = 10, verbose: bool = True, 
-              conversation_history: list = None, return_references: bool = True):
-        """Answer a question using RAG.
+    def prepare_messages(self, question: str, n_results: int = 10, verbose: bool = True,
+                         conversation_history: list = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Retrieve context for a question and build the LLM messages.
         
         Args:
             question: User's question
             n_results: Number of documents to retrieve
             verbose: Whether to print debug information
             conversation_history: Optional list of previous messages for context
-            return_references: Whether to return references along with answer
             
         Returns:
-            If return_references is True: Tuple of (answer, references)
-            Otherwise: Just the answer string
+            Tuple of (messages, text_contexts, visual_contexts)
         """
         # Retrieve relevant context
         if verbose:
@@ -388,6 +416,99 @@ class RAGQuerySystem:
             if conversation_history:
                 print(f"Including {len(conversation_history)} messages from conversation history")
         
+        return messages, text_contexts, visual_contexts
+    
+    def build_references(self, text_contexts: List[Dict], visual_contexts: List[Dict]) -> List[Dict]:
+        """Format retrieved contexts as references for the frontend.
+        
+        Args:
+            text_contexts: Retrieved text sections
+            visual_contexts: Retrieved figures and tables
+            
+        Returns:
+            List of reference dictionaries
+        """
+        references = []
+        
+        # Add text contexts as references
+        for i, ctx in enumerate(text_contexts):
+            metadata = ctx.get('metadata', {})
+            
+            # Extract bounding box if available
+            position = None
+            if all(k in metadata for k in ['bbox_x0', 'bbox_y0', 'bbox_x1', 'bbox_y1']):
+                # All elements now use hi-res coordinates - apply uniform 2.78x scaling
+                scale_factor = 2.78
+                position = {
+                    'boundingRect': {
+                        'x1': metadata.get('bbox_x0', 0) / scale_factor,
+                        'y1': metadata.get('bbox_y0', 0) / scale_factor,
+                        'x2': metadata.get('bbox_x1', 0) / scale_factor,
+                        'y2': metadata.get('bbox_y1', 0) / scale_factor,
+                        'pageNumber': metadata.get('page', 1)
+                    }
+                }
+            
+            ref = {
+                'id': f"text_{i}",
+                'page_number': metadata.get('page', 1),
+                'text_preview': ctx.get('content', '')[:200],  # First 200 chars
+                'relevance_score': ctx.get('score', 0.5),
+                'images': [],  # No images for text references
+                'position': position
+            }
+            references.append(ref)
+        
+        # Add visual contexts as references
+        for i, ctx in enumerate(visual_contexts):
+            metadata = ctx.get('metadata', {})
+            
+            # Extract bounding box if available
+            position = None
+            if all(k in metadata for k in ['bbox_x0', 'bbox_y0', 'bbox_x1', 'bbox_y1']):
+                # All elements now use hi-res coordinates - apply uniform 2.78x scaling
+                scale_factor = 2.78
+                position = {
+                    'boundingRect': {
+                        'x1': metadata.get('bbox_x0', 0) / scale_factor,
+                        'y1': metadata.get('bbox_y0', 0) / scale_factor,
+                        'x2': metadata.get('bbox_x1', 0) / scale_factor,
+                        'y2': metadata.get('bbox_y1', 0) / scale_factor,
+                        'pageNumber': metadata.get('page', 1)
+                    }
+                }
+            
+            ref = {
+                'id': f"visual_{i}",
+                'page_number': metadata.get('page', 1),
+                'text_preview': metadata.get('caption', metadata.get('description', '')),
+                'relevance_score': ctx.get('score', 0.5),
+                'images': [],  # Could add image data if needed
+                'position': position
+            }
+            references.append(ref)
+        
+        return references
+    
+    def query(self, question: str, n_results: int = 10, verbose: bool = True, 
+              conversation_history: list = None, return_references: bool = True):
+        """Answer a question using RAG.
+        
+        Args:
+            question: User's question
+            n_results: Number of documents to retrieve
+            verbose: Whether to print debug information
+            conversation_history: Optional list of previous messages for context
+            return_references: Whether to return references along with answer
+            
+        Returns:
+            If return_references is True: Tuple of (answer, references)
+            Otherwise: Just the answer string
+        """
+        messages, text_contexts, visual_contexts = self.prepare_messages(
+            question, n_results, verbose, conversation_history
+        )
+        
         try:
             # For Azure OpenAI, model parameter should be the deployment name
             response = self.llm_client.chat.completions.create(
@@ -400,76 +521,54 @@ class RAGQuerySystem:
             answer = response.choices[0].message.content
             
             if return_references:
-                # Format references for frontend
-                references = []
-                
-                # Add text contexts as references
-                for i, ctx in enumerate(text_contexts):
-                    metadata = ctx.get('metadata', {})
-                    
-                    # Extract bounding box if available
-                    position = None
-                    if all(k in metadata for k in ['bbox_x0', 'bbox_y0', 'bbox_x1', 'bbox_y1']):
-                        # All elements now use hi-res coordinates - apply uniform 2.78x scaling
-                        scale_factor = 2.78
-                        position = {
-                            'boundingRect': {
-                                'x1': metadata.get('bbox_x0', 0) / scale_factor,
-                                'y1': metadata.get('bbox_y0', 0) / scale_factor,
-                                'x2': metadata.get('bbox_x1', 0) / scale_factor,
-                                'y2': metadata.get('bbox_y1', 0) / scale_factor,
-                                'pageNumber': metadata.get('page', 1)
-                            }
-                        }
-                    
-                    ref = {
-                        'id': f"text_{i}",
-                        'page_number': metadata.get('page', 1),
-                        'text_preview': ctx.get('content', '')[:200],  # First 200 chars
-                        'relevance_score': ctx.get('score', 0.5),
-                        'images': [],  # No images for text references
-                        'position': position
-                    }
-                    references.append(ref)
-                
-                # Add visual contexts as references
-                for i, ctx in enumerate(visual_contexts):
-                    metadata = ctx.get('metadata', {})
-                    
-                    # Extract bounding box if available
-                    position = None
-                    if all(k in metadata for k in ['bbox_x0', 'bbox_y0', 'bbox_x1', 'bbox_y1']):
-                        # All elements now use hi-res coordinates - apply uniform 2.78x scaling
-                        scale_factor = 2.78
-                        position = {
-                            'boundingRect': {
-                                'x1': metadata.get('bbox_x0', 0) / scale_factor,
-                                'y1': metadata.get('bbox_y0', 0) / scale_factor,
-                                'x2': metadata.get('bbox_x1', 0) / scale_factor,
-                                'y2': metadata.get('bbox_y1', 0) / scale_factor,
-                                'pageNumber': metadata.get('page', 1)
-                            }
-                        }
-                    
-                    ref = {
-                        'id': f"visual_{i}",
-                        'page_number': metadata.get('page', 1),
-                        'text_preview': metadata.get('caption', metadata.get('description', '')),
-                        'relevance_score': ctx.get('score', 0.5),
-                        'images': [],  # Could add image data if needed
-                        'position': position
-                    }
-                    references.append(ref)
-                
-                return answer, references
+                return answer, self.build_references(text_contexts, visual_contexts)
             else:
                 return answer
             
         except Exception as e:
             if return_references:
-                return f"Error calling LLM: {e}", []
+                return f"{LLM_ERROR_PREFIX}{e}", []
             else:
-                return f"Error calling LLM: {e}"
+                return f"{LLM_ERROR_PREFIX}{e}"
+    
+    def query_stream(self, question: str, n_results: int = 10,
+                     conversation_history: list = None) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+        """Answer a question using RAG, yielding the answer as it is generated.
+        
+        Args:
+            question: User's question
+            n_results: Number of documents to retrieve
+            conversation_history: Optional list of previous messages for context
+            
+        Yields:
+            (token, None) for each piece of the answer, then ("", references) once
+            the answer is complete. LLM errors are raised, not yielded.
+        """
+        messages, text_contexts, visual_contexts = self.prepare_messages(
+            question, n_results, False, conversation_history
+        )
+        
+        stream = self.llm_client.chat.completions.create(
+            model=self.model_name,  # This is the deployment name for Azure
+            messages=messages,
+            temperature=0.7,
+            max_tokens=1000,
+            stream=True
+        )
+        
+        # Closing this generator early closes the HTTP response as well
+        try:
+            for chunk in stream:
+                # Azure sends chunks without choices (e.g. content filter results)
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token, None
+        finally:
+            stream.close()
+        
+        yield "", self.build_references(text_contexts, visual_contexts)
 
 
 def main():
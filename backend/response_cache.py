@@ -0,0 +1,153 @@
+"""
+In-memory caches for chat answers.
+Repeating a stateless question about a document (exactly, or as a close
+paraphrase) returns the stored answer instead of another retrieval and LLM
+round-trip.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 3600
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_SEMANTIC_ENTRIES = 256
+
+
+class ResponseCache:
+    """LRU cache of (answer, references) keyed by document, n_results and question.
+    
+    Questions are compared case-insensitively with whitespace collapsed.
+    Entries expire ttl_seconds after they were stored.
+    """
+    
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int, str], Tuple[float, str, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(document_id: str, question: str, n_results: int) -> Tuple[str, int, str]:
+        """Cache key of a question: identical for questions that differ only in case or spacing."""
+        return (document_id, n_results, " ".join(question.split()).lower())
+    
+    def get(self, document_id: str, question: str,
+            n_results: int) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Return the cached (answer, references), or None on a miss or an expired entry."""
+        key = self.key(document_id, question, n_results)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            stored_at, answer, references = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return answer, references
+    
+    def set(self, document_id: str, question: str, n_results: int,
+            answer: str, references: List[Dict[str, Any]]) -> None:
+        """Store an answer, evicting the least recently used entries beyond max_entries."""
+        key = self.key(document_id, question, n_results)
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer, references)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, document_id: str) -> None:
+        """Drop every entry for a document."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == document_id]:
+                del self._entries[key]
+
+
+class _SemanticEntries:
+    """Question embeddings of one document and n_results, with their answers."""
+    
+    def __init__(self, dimension: int, capacity: int):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.answers: List[Tuple[str, List[Dict[str, Any]]]] = []
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+
+
+class SemanticCache:
+    """Answers keyed by question embedding, matched by cosine similarity.
+    
+    Embeddings must be L2-normalized, so similarity is a single matrix-vector
+    product. A question matches when its similarity to a stored question is
+    at least similarity_threshold. Each document and n_results keeps up to
+    max_entries questions, evicting the least recently used.
+    """
+    
+    def __init__(self, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries: int = DEFAULT_SEMANTIC_ENTRIES):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, int], _SemanticEntries] = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    def get(self, document_id: str, embedding: Sequence[float],
+            n_results: int) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Return the (answer, references) of the most similar stored question, or None."""
+        with self._lock:
+            entries = self._entries.get((document_id, n_results))
+            if entries is None or not entries.answers:
+                return None
+            
+            count = len(entries.answers)
+            query = np.asarray(embedding, dtype=np.float32)
+            if query.shape[0] != entries.vectors.shape[1]:
+                return None
+            
+            similarities = entries.vectors[:count] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            
+            self._clock += 1
+            entries.last_used[best] = self._clock
+            return entries.answers[best]
+    
+    def set(self, document_id: str, embedding: Sequence[float], n_results: int,
+            answer: str, references: List[Dict[str, Any]]) -> None:
+        """Store an answer under a question embedding."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        key = (document_id, n_results)
+        
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+                entries = _SemanticEntries(vector.shape[0], self.max_entries)
+                self._entries[key] = entries
+            
+            if len(entries.answers) < self.max_entries:
+                row = len(entries.answers)
+                entries.answers.append((answer, references))
+            else:
+                row = int(np.argmin(entries.last_used))
+                entries.answers[row] = (answer, references)
+            
+            self._clock += 1
+            entries.vectors[row] = vector
+            entries.last_used[row] = self._clock
+    
+    def invalidate(self, document_id: str) -> None:
+        """Drop every entry for a document."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == document_id]:
+                del self._entries[key]
@@ -0,0 +1,120 @@
+"""
+Persistent store for document sessions.
+Sessions live in a SQLite table so they survive restarts and are shared by
+every uvicorn worker. Every read goes to the table (a primary-key lookup), so
+a change made by one worker is seen by all of them. The processing status of
+uploads is kept in a second table for the same reason.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from utils import json_utils
+
+
+DEFAULT_DB_PATH = Path("sessions.db")
+
+
+class SessionStore:
+    """Dict-like map of document_id to a JSON-serializable session dict.
+    
+    Reads and writes go straight to SQLite. A returned session is a fresh
+    copy; changes to it are only stored once it is assigned back with
+    store[document_id].
+    """
+    
+    def __init__(self, db_path: Union[str, Path] = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        # WAL lets other workers read while one of them writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (document_id TEXT PRIMARY KEY, payload BLOB NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS statuses (document_id TEXT PRIMARY KEY, payload BLOB NOT NULL)"
+        )
+        self._connection.commit()
+    
+    def get(self, document_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return the session, or default if there is none."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM sessions WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        
+        if row is None:
+            return default
+        return json_utils.loads(row[0])
+    
+    def __getitem__(self, document_id: str) -> Dict[str, Any]:
+        session = self.get(document_id)
+        if session is None:
+            raise KeyError(document_id)
+        return session
+    
+    def __contains__(self, document_id: object) -> bool:
+        return isinstance(document_id, str) and self.get(document_id) is not None
+    
+    def __setitem__(self, document_id: str, session: Dict[str, Any]) -> None:
+        payload = json_utils.dumps(session)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (document_id, payload) VALUES (?, ?)",
+                (document_id, payload)
+            )
+            self._connection.commit()
+    
+    def __delitem__(self, document_id: str) -> None:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM sessions WHERE document_id = ?", (document_id,)
+            )
+            self._connection.commit()
+            if cursor.rowcount == 0:
+                raise KeyError(document_id)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """All stored sessions, read from SQLite."""
+        with self._lock:
+            rows = self._connection.execute("SELECT document_id, payload FROM sessions").fetchall()
+        for document_id, payload in rows:
+            yield document_id, json_utils.loads(payload)
+    
+    def get_status(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Return the processing status of a document, or None if there is none."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM statuses WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return json_utils.loads(row[0])
+    
+    def set_status(self, document_id: str, status: Dict[str, Any]) -> None:
+        """Store the processing status of a document."""
+        payload = json_utils.dumps(status)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO statuses (document_id, payload) VALUES (?, ?)",
+                (document_id, payload)
+            )
+            self._connection.commit()
+    
+    def delete_status(self, document_id: str) -> None:
+        """Forget the processing status of a document, if it has one."""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM statuses WHERE document_id = ?", (document_id,)
+            )
+            self._connection.commit()
@@ -3,8 +3,11 @@ Bounding box utilities for PDF extraction.
 Contains operations for bounding box manipulation, comparison, and extraction.
 """
 
-from typing import Optional, List
-from core.pdf_extraction_models import BoundingBox, BoundingBoxLegacy
+from typing import Dict, Optional, List, Sequence, Tuple
+
+import numpy as np
+
+from core.pdf_extraction_models import BoundingBox, BoundingBoxArray, BoundingBoxLegacy
 from core.pdf_extraction_config import PDFConstants
 
 
@@ -19,32 +22,64 @@ class BoundingBoxOperations:
             element: Element with metadata containing coordinates
             scale_to_hires: If True, scale fast mode coordinates to hi-res (multiply by 2.78)
         """
-        if not hasattr(element, 'metadata') or not hasattr(element.metadata, 'coordinates'):
+        bounds = BoundingBoxOperations.raw_bounds(element)
+        if bounds is None:
             return None
         
-        coordinates = element.metadata.coordinates
-        if not coordinates or not hasattr(coordinates, 'points'):
+        x_min, y_min, x_max, y_max = bounds
+        
+        # Apply scaling if requested (for fast mode -> hi-res conversion);
+        # the factor is positive, so scaling the extremes equals scaling every point
+        if scale_to_hires:
+            scale_factor = PDFConstants.FAST_TO_HIGH_RES_SCALE
+            x_min, y_min, x_max, y_max = (x_min * scale_factor, y_min * scale_factor,
+                                          x_max * scale_factor, y_max * scale_factor)
+        
+        return BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max)
+    
+    @staticmethod
+    def raw_dimensions(element) -> Optional[Tuple[float, float]]:
+        """Return (width, height) from element coordinates without building a BoundingBox."""
+        bounds = BoundingBoxOperations.raw_bounds(element)
+        if bounds is None:
             return None
         
-        points = coordinates.points
+        x_min, y_min, x_max, y_max = bounds
+        return (x_max - x_min, y_max - y_min)
+    
+    @staticmethod
+    def raw_bounds(element) -> Optional[Tuple[float, float, float, float]]:
+        """Return unscaled (x_min, y_min, x_max, y_max) from element coordinates.
+        
+        Points arrive from unstructured as (x, y) float pairs, so no parsing is
+        needed; they are transposed once instead of copied into two lists.
+        """
+        coordinates = getattr(getattr(element, 'metadata', None), 'coordinates', None)
+        points = getattr(coordinates, 'points', None) if coordinates else None
         if not points or len(points) < 2:
             return None
         
-        x_coordinates = [point[0] for point in points]
-        y_coordinates = [point[1] for point in points]
+        x_coordinates, y_coordinates = zip(*points)
+        return (min(x_coordinates), min(y_coordinates),
+                max(x_coordinates), max(y_coordinates))
+    
+    @staticmethod
+    def create_many_from_bounds(bounds: Sequence[Optional[Tuple[float, float, float, float]]],
+                                scale_factor: float = 1.0) -> List[Optional[BoundingBox]]:
+        """Scale many raw_bounds results in one array operation and build BoundingBoxes.
         
-        # Apply scaling if requested (for fast mode -> hi-res conversion)
-        if scale_to_hires:
-            scale_factor = 2.78  # Fast mode to hi-res scaling
-            x_coordinates = [x * scale_factor for x in x_coordinates]
-            y_coordinates = [y * scale_factor for y in y_coordinates]
+        None entries stay None. Scaling the min/max of the points equals
+        create_from_element's scale-then-min/max, since the factor is positive.
+        """
+        present = [bound for bound in bounds if bound is not None]
+        scaled = iter((np.array(present, dtype=np.float64).reshape(-1, 4) * scale_factor).tolist())
         
-        return BoundingBox(
-            x_min=min(x_coordinates),
-            y_min=min(y_coordinates),
-            x_max=max(x_coordinates),
-            y_max=max(y_coordinates)
-        )
+        return [BoundingBox(*next(scaled)) if bound is not None else None for bound in bounds]
+    
+    @staticmethod
+    def to_array(bounding_boxes: Sequence[BoundingBox]) -> BoundingBoxArray:
+        """Pack bounding boxes into a BoundingBoxArray for vectorized checks."""
+        return BoundingBoxArray.from_boxes(bounding_boxes)
     
     @staticmethod
     def merge(first: BoundingBox, second: BoundingBox) -> BoundingBox:
@@ -79,6 +114,69 @@ class BoundingBoxOperations:
                 (horizontal_gap <= max_gap and has_vertical_overlap))
 
 
+class BoxIndex:
+    """Spatial index over bounding boxes, grouped by page.
+    
+    Each page's boxes are sorted by x_min, so a query binary-searches the
+    boxes that start left of the query's right edge and filters only those
+    with vectorized overlap tests. containers() and adjacent() then apply the
+    exact BoundingBoxArray checks to that short list in one vectorized step.
+    """
+    
+    # Widens every query slightly so float rounding never drops a true candidate
+    _SLACK = 1e-6
+    
+    def __init__(self, boxes: Sequence[BoundingBox], pages: Sequence[int]):
+        positions_by_page: Dict[int, List[int]] = {}
+        for position, page in enumerate(pages):
+            positions_by_page.setdefault(page, []).append(position)
+        
+        # Ascending positions per page, for callers that scan a whole page
+        self._positions_by_page = positions_by_page
+        
+        self._pages: Dict[int, Tuple[np.ndarray, BoundingBoxArray]] = {}
+        for page, positions in positions_by_page.items():
+            page_boxes = BoundingBoxArray.from_boxes([boxes[position] for position in positions])
+            order = np.argsort(page_boxes.x_min, kind='stable')
+            self._pages[page] = (np.array(positions)[order], page_boxes.take(order))
+    
+    def _candidates(self, box: BoundingBox, page: int,
+                    margin: float) -> Tuple[np.ndarray, BoundingBoxArray]:
+        """Positions and boxes on page that overlap box grown by margin."""
+        entry = self._pages.get(page)
+        if entry is None:
+            return np.empty(0, dtype=np.int64), BoundingBoxArray.from_boxes([])
+        
+        positions, page_boxes = entry
+        margin += self._SLACK
+        end = int(np.searchsorted(page_boxes.x_min, box.x_max + margin, side='right'))
+        overlaps = np.flatnonzero((page_boxes.x_max[:end] >= box.x_min - margin) &
+                                  (page_boxes.y_min[:end] <= box.y_max + margin) &
+                                  (page_boxes.y_max[:end] >= box.y_min - margin))
+        return positions[overlaps], page_boxes.take(overlaps)
+    
+    def query(self, box: BoundingBox, page: int, margin: float = 0.0) -> List[int]:
+        """Positions (ascending) of boxes on page that overlap box grown by margin."""
+        positions, _ = self._candidates(box, page, margin)
+        return np.sort(positions).tolist()
+    
+    def containers(self, box: BoundingBox, page: int,
+                   tolerance: float = PDFConstants.BBOX_TOLERANCE) -> List[int]:
+        """Positions (ascending) of boxes on page that contain box, box itself included."""
+        positions, candidates = self._candidates(box, page, tolerance)
+        return np.sort(positions[candidates.contains(box, tolerance)]).tolist()
+    
+    def adjacent(self, box: BoundingBox, page: int,
+                 max_gap: float = PDFConstants.MAX_ADJACENCY_GAP) -> List[int]:
+        """Positions (ascending) of boxes on page adjacent to box, box itself included."""
+        positions, candidates = self._candidates(box, page, max_gap)
+        return np.sort(positions[candidates.adjacent_to(box, max_gap)]).tolist()
+    
+    def on_page(self, page: int) -> List[int]:
+        """Positions (ascending) of all boxes on page."""
+        return self._positions_by_page.get(page, [])
+
+
 class BoundingBoxCalculator:
     """Calculator for bounding box operations (legacy naming for extract_all_elements.py)."""
     
@@ -3,7 +3,8 @@ Caption detection and extraction utilities for PDF processing.
 Handles finding and classifying captions for figures and tables.
 """
 
-from typing import List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
 from unstructured.documents.elements import (
     Element, 
     Title,
@@ -23,6 +24,10 @@ class CaptionDetector:
     TABLE_KEYWORDS = CaptionKeywords.TABLE_KEYWORDS
     DESCRIPTION_KEYWORDS = CaptionKeywords.DESCRIPTION_KEYWORDS
     
+    FIGURE_MATCHER = CaptionKeywords.FIGURE_MATCHER
+    TABLE_MATCHER = CaptionKeywords.TABLE_MATCHER
+    DESCRIPTION_MATCHER = CaptionKeywords.DESCRIPTION_MATCHER
+    
     @classmethod
     def find_caption_and_description(cls, elements: List[Element], 
                                    element_index: int, element_page: int) -> Tuple[Optional[str], Optional[str], Optional[BoundingBox], ElementType]:
@@ -80,12 +85,12 @@ class CaptionDetector:
         text = str(element).strip()
         
         # Check for table patterns first (more specific)
-        if any(pattern in text.lower() for pattern in cls.TABLE_KEYWORDS):
+        if cls.TABLE_MATCHER.search(text.lower()):
             if cls._is_closer_match(current_index, target_index, existing_caption):
                 return text, ElementType.TABLE, BoundingBoxOperations.create_from_element(element)
         
         # Check for figure patterns
-        elif any(pattern in text for pattern in cls.FIGURE_KEYWORDS):
+        elif cls.FIGURE_MATCHER.search(text):
             if cls._is_closer_match(current_index, target_index, existing_caption):
                 return text, ElementType.FIGURE, BoundingBoxOperations.create_from_element(element)
         
@@ -97,7 +102,7 @@ class CaptionDetector:
         """Process Text element for table caption extraction."""
         text = str(element).strip()
         
-        if any(pattern in text.lower() for pattern in cls.TABLE_KEYWORDS):
+        if cls.TABLE_MATCHER.search(text.lower()):
             return text, ElementType.TABLE, BoundingBoxOperations.create_from_element(element)
         
         return None
@@ -114,7 +119,7 @@ class CaptionDetector:
             return None
         
         text = str(element).strip()
-        if any(pattern in text for pattern in cls.DESCRIPTION_KEYWORDS):
+        if cls.DESCRIPTION_MATCHER.search(text):
             return text
         
         return None
@@ -130,18 +135,23 @@ class CaptionExtractor:
         start_idx = max(0, element_index - PDFConstants.CAPTION_SEARCH_RANGE)
         end_idx = min(len(elements), element_index + PDFConstants.CAPTION_SEARCH_RANGE + 1)
         
+        candidate_indices = [
+            i for i in range(start_idx, end_idx)
+            if i != element_index and CaptionExtractor._is_same_page(elements[i], element_page)
+        ]
+        return CaptionExtractor._scan_candidates(elements, candidate_indices, element_index)
+    
+    @staticmethod
+    def _scan_candidates(elements: List[Element], candidate_indices: List[int],
+                        element_index: int) -> CaptionInfo:
+        """Pick caption, description and caption bbox from same-page neighbours, in index order."""
         caption = None
         description = None
         title_bbox = None
         caption_type = 'unknown'
         
-        for i in range(start_idx, end_idx):
-            if i == element_index:
-                continue
-                
+        for i in candidate_indices:
             element = elements[i]
-            if not CaptionExtractor._is_same_page(element, element_page):
-                continue
             
             if isinstance(element, Title):
                 caption_candidate = CaptionExtractor._extract_title_caption(
@@ -214,25 +224,79 @@ class CaptionExtractor:
         """Extract description from NarrativeText element."""
         if abs(element_index - target_index) <= 2:
             text = str(element).strip()
-            if any(pattern in text for pattern in 
-                  ['図', 'Figure', 'table', '表', 'Table']):
+            if CaptionKeywords.DESCRIPTION_MATCHER.search(text):
                 return text
         return None
     
     @staticmethod
     def _is_table_caption(text: str) -> bool:
         """Check if text is a table caption."""
-        return any(pattern in text.lower() for pattern in 
-                  CaptionKeywords.TABLE_KEYWORDS)
+        return CaptionKeywords.TABLE_MATCHER.search(text.lower())
     
     @staticmethod
     def _is_figure_caption(text: str) -> bool:
         """Check if text is a figure caption."""
-        return any(pattern in text for pattern in 
-                  CaptionKeywords.FIGURE_KEYWORDS)
+        return CaptionKeywords.FIGURE_MATCHER.search(text)
     
     @staticmethod
     def _is_closer_than_existing(element_index: int, target_index: int,
                                 existing_caption: Optional[str]) -> bool:
         """Check if element is closer than existing caption."""
-        return not existing_caption or abs(element_index - target_index) < 3
\ No newline at end of file
+        return not existing_caption or abs(element_index - target_index) < 3
+
+
+# Page key for elements without page information; they match every page
+_ANY_PAGE = object()
+
+
+class CaptionIndex:
+    """Caption lookup for one element list, built once and shared by all callers.
+    
+    Caption candidates (Text elements) are grouped by page, so a lookup only
+    bisects into its own page's indices instead of scanning the window, and
+    each (element_index, page) result is computed once.
+    """
+    
+    def __init__(self, elements: List[Element]):
+        self.elements = elements
+        self._page_indices: Dict[Any, List[int]] = {}
+        self._results: Dict[Tuple[int, int], CaptionInfo] = {}
+        
+        for index, element in enumerate(elements):
+            if isinstance(element, Text):
+                self._page_indices.setdefault(self._page_key(element), []).append(index)
+    
+    @staticmethod
+    def _page_key(element: Element) -> Any:
+        """Page number as compared by CaptionExtractor._is_same_page."""
+        if not (hasattr(element, 'metadata') and
+                hasattr(element.metadata, 'page_number')):
+            return _ANY_PAGE
+        return element.metadata.page_number
+    
+    def find_for_element(self, element_index: int, element_page: int) -> CaptionInfo:
+        """Same result as CaptionExtractor.find_for_element(self.elements, ...)."""
+        key = (element_index, element_page)
+        caption_info = self._results.get(key)
+        if caption_info is None:
+            caption_info = self._results[key] = self._find(element_index, element_page)
+        return caption_info
+    
+    def _find(self, element_index: int, element_page: int) -> CaptionInfo:
+        low = element_index - PDFConstants.CAPTION_SEARCH_RANGE
+        high = element_index + PDFConstants.CAPTION_SEARCH_RANGE
+        
+        candidate_indices = self._in_window(self._page_indices.get(element_page), low, high)
+        pageless_indices = self._in_window(self._page_indices.get(_ANY_PAGE), low, high)
+        if pageless_indices:
+            candidate_indices = sorted(candidate_indices + pageless_indices)
+        
+        candidate_indices = [i for i in candidate_indices if i != element_index]
+        return CaptionExtractor._scan_candidates(self.elements, candidate_indices, element_index)
+    
+    @staticmethod
+    def _in_window(indices: Optional[List[int]], low: int, high: int) -> List[int]:
+        """Sorted indices within [low, high]."""
+        if not indices:
+            return []
+        return indices[bisect_left(indices, low):bisect_right(indices, high)]
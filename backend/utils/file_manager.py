@@ -4,13 +4,14 @@ Handles directory creation, cleanup, and file organization.
 """
 
 import shutil
-import json
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 import tempfile
 import os
 import fitz
 
+from . import json_utils
+
 
 class PDFFileManager:
     """Manages file system operations for PDF extraction."""
@@ -26,19 +27,15 @@ class PDFFileManager:
         self.figures_directory.mkdir(exist_ok=True)
         self.tables_directory.mkdir(exist_ok=True)
     
-    def cleanup_page_directories(self, total_pages: int) -> None:
-        """Remove temporary page directories."""
-        for page_num in range(1, total_pages + 1):
-            page_dir = self.output_directory / f"page_{page_num}"
-            if page_dir.exists():
-                shutil.rmtree(page_dir)
+    def cleanup_page_directories(self, page_directories: List[Path]) -> None:
+        """Remove the given temporary page directories."""
+        for page_dir in page_directories:
+            shutil.rmtree(page_dir, ignore_errors=True)
     
     def save_metadata_json(self, metadata: Dict[str, Any]) -> None:
-        """Save metadata to JSON file."""
+        """Save metadata to JSON file (compact, streamed section by section)."""
         metadata_path = self.output_directory / "metadata.json"
-        
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        json_utils.dump_stream_to_file(metadata, metadata_path)
     
     def save_markdown_file(self, content: str, filename: str = "extracted_content.md") -> None:
         """Save markdown content to file."""
@@ -77,6 +74,30 @@ class PDFPageSplitter:
         return page_files
 
 
+    @staticmethod
+    def split_pdf_ranges(pdf_bytes: bytes, range_count: int) -> List[Tuple[int, bytes]]:
+        """Split an in-memory PDF into at most range_count PDFs of consecutive pages.
+        
+        Returns list of (page_offset, range_pdf_bytes) tuples, where page_offset
+        is the number of pages preceding the range in the original PDF.
+        """
+        page_ranges = []
+        
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            total_pages = len(doc)
+            range_count = max(1, min(range_count, total_pages))
+            pages_per_range = -(-total_pages // range_count)  # ceiling division
+            
+            for first_page in range(0, total_pages, pages_per_range):
+                last_page = min(first_page + pages_per_range, total_pages) - 1
+                
+                with fitz.open() as range_doc:
+                    range_doc.insert_pdf(doc, from_page=first_page, to_page=last_page)
+                    page_ranges.append((first_page, range_doc.tobytes()))
+        
+        return page_ranges
+
+
 class TempDirectoryManager:
     """Context manager for temporary directory handling."""
     
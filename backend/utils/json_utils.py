@@ -0,0 +1,77 @@
+"""
+JSON serialization helpers.
+Uses orjson when it is installed and falls back to the standard library json module.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 encoded JSON bytes (non-ASCII characters kept as-is)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Deserialize JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_to_file(obj: Any, path: Union[str, Path], indent: bool = False) -> None:
+    """Write obj as JSON to path."""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def dump_stream_to_file(obj: Any, path: Union[str, Path]) -> None:
+    """Write obj as compact JSON to path, one list item at a time.
+    
+    Top-level dict values and list items are serialized and written
+    separately, so the whole document is never held as one JSON string.
+    """
+    with open(path, 'wb') as f:
+        if isinstance(obj, dict):
+            f.write(b'{')
+            for position, (key, value) in enumerate(obj.items()):
+                if position:
+                    f.write(b',')
+                f.write(dumps(str(key)))
+                f.write(b':')
+                _write_value(f, value)
+            f.write(b'}')
+        else:
+            _write_value(f, obj)
+
+
+def _write_value(f, value: Any) -> None:
+    """Write value to f, streaming the items of a list."""
+    if not isinstance(value, (list, tuple)):
+        f.write(dumps(value))
+        return
+    
+    f.write(b'[')
+    for position, item in enumerate(value):
+        if position:
+            f.write(b',')
+        f.write(dumps(item))
+    f.write(b']')
+
+
+def load_from_file(path: Union[str, Path]) -> Any:
+    """Read JSON from path."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
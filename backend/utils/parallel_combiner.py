@@ -3,10 +3,12 @@ Result combination utilities for parallel PDF extraction.
 Handles merging results from multiple page extractions.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 import shutil
 
+from . import json_utils
+
 
 class ParallelResultCombiner:
     """Combines results from parallel page extraction."""
@@ -28,11 +30,14 @@ class ParallelResultCombiner:
         section_counter = 0
         
         for page_result in page_results:
-            if not page_result["success"] or not page_result["metadata"]:
+            if not page_result["success"]:
+                continue
+            
+            page_metadata = self._load_page_metadata(page_result)
+            if not page_metadata:
                 continue
             
             page_num = page_result["page"]
-            page_metadata = page_result["metadata"]
             
             # Process each section in the page
             for section in page_metadata.get("structure", []):
@@ -100,6 +105,18 @@ class ParallelResultCombiner:
         
         return combined_metadata
     
+    @staticmethod
+    def _load_page_metadata(page_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Load a page's metadata, either inline or from the file written by its worker."""
+        if page_result.get("metadata") is not None:
+            return page_result["metadata"]
+        
+        metadata_path = page_result.get("metadata_path")
+        if not metadata_path:
+            return None
+        
+        return json_utils.load_from_file(metadata_path)
+    
     def fix_text_content_references(self, section: Dict[str, Any]) -> None:
         """Fix figure and table references in text_content to use correct page numbers."""
         text_content = section.get("text_content", "")
@@ -0,0 +1,114 @@
+"""
+On-disk cache for PDF partition results.
+Re-running extraction on an unchanged PDF reuses the stored elements instead of
+repeating the partition passes. Entries hold the full text of the document, so
+the cache is opt-in and its directory is kept under a size limit.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, List, Mapping, Optional, Union
+
+
+DEFAULT_CACHE_DIRECTORY = Path.home() / ".cache" / "hybrid_pdf"
+
+# Least recently used entries are removed once the directory grows past this
+DEFAULT_MAX_CACHE_BYTES = 1024 * 1024 * 1024
+
+
+def _unstructured_version() -> str:
+    """Installed unstructured version; part of the key so upgrades invalidate entries."""
+    try:
+        return metadata.version("unstructured")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class PartitionCache:
+    """Pickled partition results keyed by SHA-256 of the PDF and the partition settings.
+    
+    The settings are the keyword arguments passed to partition_pdf (everything
+    but the file), so changing any of them misses the cache.
+    """
+    
+    def __init__(self, pdf_bytes: bytes,
+                 cache_directory: Union[str, Path] = DEFAULT_CACHE_DIRECTORY,
+                 max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        self.cache_directory = Path(cache_directory)
+        self.max_bytes = max_bytes
+        self.document_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    
+    def _entry_path(self, settings: Mapping[str, Any]) -> Path:
+        """Cache file for the given partition settings."""
+        key = json.dumps({
+            "settings": settings,
+            "unstructured": _unstructured_version(),
+            # partition_pdf picks its default hi_res layout model from here
+            "hi_res_model": os.environ.get("UNSTRUCTURED_HI_RES_MODEL_NAME", ""),
+        }, sort_keys=True, default=str)
+        settings_hash = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+        return self.cache_directory / f"{self.document_hash}_{settings['strategy']}_{settings_hash}.pkl"
+    
+    def load(self, settings: Mapping[str, Any]) -> Optional[List[Any]]:
+        """Return cached elements, or None on a miss or an unreadable entry."""
+        entry_path = self._entry_path(settings)
+        
+        try:
+            with open(entry_path, 'rb') as f:
+                elements = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: ignoring unreadable partition cache {entry_path}: {e}")
+            return None
+        
+        # Refresh the modification time, which orders entries for eviction
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return elements
+    
+    def store(self, settings: Mapping[str, Any], elements: List[Any]) -> None:
+        """Store elements; written to a temp file first so readers never see partial entries.
+        
+        Failing to write the cache is reported but never fails the extraction.
+        """
+        entry_path = self._entry_path(settings)
+        temp_path = None
+        
+        try:
+            self.cache_directory.mkdir(parents=True, exist_ok=True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix=".tmp")
+            with os.fdopen(file_descriptor, 'wb') as f:
+                pickle.dump(elements, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except Exception as e:
+            print(f"Warning: could not write partition cache {entry_path}: {e}")
+            if temp_path:
+                Path(temp_path).unlink(missing_ok=True)
+            return
+        
+        self._evict()
+    
+    def _evict(self) -> None:
+        """Remove least recently used entries until the directory fits in max_bytes."""
+        entries = []
+        for entry_path in self.cache_directory.glob("*.pkl"):
+            try:
+                stat_result = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat_result.st_mtime, stat_result.st_size, entry_path))
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= size
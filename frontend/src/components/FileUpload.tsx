@@ -3,6 +3,9 @@
 import { useState } from 'react';
 import { Upload, FileText, Loader2 } from 'lucide-react';
 import { API_ENDPOINTS } from '../config/environment';
+import { ProcessingStatus } from '../types/domain';
+
+const STATUS_POLL_INTERVAL_MS = 1000;
 
 interface FileUploadProps {
   onUploadComplete: (documentId: string) => void;
@@ -11,6 +14,22 @@ interface FileUploadProps {
 export default function FileUpload({ onUploadComplete }: FileUploadProps) {
   const [uploading, setUploading] = useState(false);
   const [dragOver, setDragOver] = useState(false);
+  const [statusMessage, setStatusMessage] = useState('Uploading PDF...');
+
+  const waitForProcessing = async (initial: ProcessingStatus): Promise<ProcessingStatus> => {
+    let status = initial;
+    while (status.status !== 'completed' && status.status !== 'failed') {
+      setStatusMessage(status.message);
+      await new Promise((resolve) => setTimeout(resolve, STATUS_POLL_INTERVAL_MS));
+
+      const response = await fetch(API_ENDPOINTS.getProcessingStatus(status.document_id));
+      if (!response.ok) {
+        throw new Error('Status check failed');
+      }
+      status = await response.json();
+    }
+    return status;
+  };
 
   const handleFileUpload = async (file: File) => {
     if (!file.type.includes('pdf')) {
@@ -19,6 +38,7 @@ export default function FileUpload({ onUploadComplete }: FileUploadProps) {
     }
 
     setUploading(true);
+    setStatusMessage('Uploading PDF...');
     
     try {
       const formData = new FormData();
@@ -33,7 +53,10 @@ export default function FileUpload({ onUploadComplete }: FileUploadProps) {
         throw new Error('Upload failed');
       }
 
-      const result = await response.json();
+      const result = await waitForProcessing(await response.json());
+      if (result.status === 'failed') {
+        throw new Error(result.message);
+      }
       onUploadComplete(result.document_id);
     } catch (error) {
       console.error('Upload error:', error);
@@ -85,7 +108,7 @@ export default function FileUpload({ onUploadComplete }: FileUploadProps) {
         {uploading ? (
           <div className="flex flex-col items-center">
             <Loader2 className="w-12 h-12 text-blue-500 animate-spin mb-4" />
-            <p className="text-gray-600">Processing PDF...</p>
+            <p className="text-gray-600">{statusMessage}</p>
           </div>
         ) : (
           <>
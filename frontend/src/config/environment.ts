@@ -5,4 +5,5 @@ export const API_ENDPOINTS = {
   chat: `${API_BASE_URL}/chat`,
   getPdf: (documentId: string) => `${API_BASE_URL}/pdf/${documentId}`,
   getDocumentInfo: (documentId: string) => `${API_BASE_URL}/document/${documentId}/info`,
+  getProcessingStatus: (documentId: string) => `${API_BASE_URL}/status/${documentId}`,
 } as const;
\ No newline at end of file
@@ -1,4 +1,4 @@
-import { QueryRequest, ChatResponse, UploadResponse, DocumentInfo } from '../types/domain';
+import { QueryRequest, ChatResponse, ProcessingStatus, DocumentInfo } from '../types/domain';
 import { API_BASE_URL, API_ENDPOINTS } from '../config/environment';
 
 class ApiError extends Error {
@@ -32,7 +32,7 @@ export class ChatApiClient {
     });
   }
 
-  async uploadDocument(file: File): Promise<UploadResponse> {
+  async uploadDocument(file: File): Promise<ProcessingStatus> {
     const formData = new FormData();
     formData.append('file', file);
 
@@ -48,6 +48,10 @@ export class ChatApiClient {
     return response.json();
   }
 
+  async getProcessingStatus(documentId: string): Promise<ProcessingStatus> {
+    return this.makeRequest<ProcessingStatus>(`/status/${documentId}`);
+  }
+
   async getDocumentInfo(documentId: string): Promise<DocumentInfo> {
     return this.makeRequest<DocumentInfo>(`/document/${documentId}/info`);
   }
@@ -59,11 +59,13 @@ export interface DocumentInfo {
   pages: number[];
 }
 
-export interface UploadResponse {
-  document_id: string;
-  filename: string;
-  chunks_processed: number;
+export type ProcessingState = 'queued' | 'extracting' | 'indexing' | 'completed' | 'failed';
+
+export interface ProcessingStatus {
+  status: ProcessingState;
+  progress: number;
   message: string;
+  document_id: string;
 }
 
 export interface PDFViewerProps {